@@ -6,6 +6,7 @@ from sqlmodel import SQLModel
 
 from alembic import context
 
+from app.core.settings import settings
 from app.models.models import Book, BorrowingRecords, Member
 
 # this is the Alembic Config object, which provides
@@ -23,7 +24,15 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = SQLModel.metadata
 
-config.set_main_option(name="sqlalchemy.url", value="sqlite:///database.db")
+config.set_main_option(name="sqlalchemy.url", value=settings.DATABASE_URL)
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # The book_fts full-text index (and the shadow tables FTS5 creates for it) is managed by
+    # hand-written migrations, autogenerate must not try to drop it.
+    if type_ == "table" and name.startswith("book_fts"):
+        return False
+    return True
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -50,6 +59,7 @@ def run_migrations_offline() -> None:
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
         render_as_batch=True,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -74,6 +84,7 @@ def run_migrations_online() -> None:
             connection=connection, 
             target_metadata=target_metadata, 
             render_as_batch=True,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
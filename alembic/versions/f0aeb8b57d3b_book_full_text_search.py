@@ -0,0 +1,66 @@
+"""book full text search
+
+Revision ID: f0aeb8b57d3b
+Revises: 60ca6bbf76f8
+Create Date: 2026-10-18 13:13:52.787657
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f0aeb8b57d3b'
+down_revision: Union[str, Sequence[str], None] = '60ca6bbf76f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # FTS5 is SQLite only, other databases are searched with LIKE (see app/services/search.py).
+    if op.get_bind().dialect.name != "sqlite":
+        return
+
+    # External-content FTS5 index over book(title, author, isbn): the text is read from the book table,
+    # only the inverted index is stored. prefix='2 3' keeps 2 and 3 character prefix indexes for "term*" queries.
+    op.execute(
+        "CREATE VIRTUAL TABLE book_fts USING fts5("
+        "title, author, isbn, content='book', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    # Triggers keep the index in sync with every write to book, including bulk INSERTs.
+    op.execute(
+        "CREATE TRIGGER book_fts_ai AFTER INSERT ON book BEGIN "
+        "INSERT INTO book_fts(rowid, title, author, isbn) VALUES (new.id, new.title, new.author, new.isbn); "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER book_fts_ad AFTER DELETE ON book BEGIN "
+        "INSERT INTO book_fts(book_fts, rowid, title, author, isbn) "
+        "VALUES ('delete', old.id, old.title, old.author, old.isbn); "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER book_fts_au AFTER UPDATE ON book BEGIN "
+        "INSERT INTO book_fts(book_fts, rowid, title, author, isbn) "
+        "VALUES ('delete', old.id, old.title, old.author, old.isbn); "
+        "INSERT INTO book_fts(rowid, title, author, isbn) VALUES (new.id, new.title, new.author, new.isbn); "
+        "END"
+    )
+    # Index the books that already exist
+    op.execute("INSERT INTO book_fts(book_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "sqlite":
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS book_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS book_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS book_fts_ai")
+    op.execute("DROP TABLE IF EXISTS book_fts")
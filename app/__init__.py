@@ -0,0 +1,2 @@
+# Imported first, so the startup report also covers the time spent importing FastAPI, SQLAlchemy, ...
+from app.core import startup  # noqa: F401
@@ -0,0 +1,120 @@
+import copy
+import logging
+import queue
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from pydantic_core import to_json
+
+from app.core.settings import settings
+
+# Id of the request being handled, attached to every log record emitted while handling it
+request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = "x-request-id"
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")  # ids from clients end up in logs, keep them tame
+
+# Attributes every LogRecord has, anything else was passed with extra={...} and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request_id and the extra={...} fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return to_json(entry, fallback=str).decode()
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-8s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = "-"
+        return super().format(record)
+
+
+class ContextQueueHandler(QueueHandler):
+    """Hands records to the listener thread, the caller only pays for an in-memory queue put"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Runs in the caller, where the request id context variable is still set. The message and traceback
+        # are rendered here too, arguments and tracebacks must not be read later from another thread.
+        record = copy.copy(record)
+        record.request_id = request_id.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging() -> QueueListener:
+    """Route the app's and uvicorn's loggers through a queue to a single stdout writer thread"""
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue = queue.SimpleQueue()  # unbounded, logging never blocks or fails the request
+    listener = QueueListener(log_queue, output, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.handlers = [ContextQueueHandler(log_queue)]
+    root.setLevel(logging.WARNING)  # third-party libraries (aiosqlite, ...) are very chatty below WARNING
+    logging.getLogger("app").setLevel(settings.LOG_LEVEL)
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        # uvicorn installs its own synchronous stdout handlers, its records go through the queue instead
+        logging.getLogger(name).handlers = []
+        logging.getLogger(name).propagate = True
+
+    listener.start()
+    return listener
+
+
+def stop_logging(listener: QueueListener):
+    """Flush the queued records and write the ones logged from now on (uvicorn's shutdown, ...) directly"""
+    listener.stop()
+    logging.getLogger().handlers = list(listener.handlers)
+
+
+class RequestIdMiddleware:
+    """Reuses the caller's X-Request-ID (or creates one), exposes it to the logs and echoes it in the response"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        incoming = dict(scope["headers"]).get(REQUEST_ID_HEADER.encode(), b"").decode("latin-1")
+        current_id = incoming if _VALID_REQUEST_ID.fullmatch(incoming) else uuid.uuid4().hex
+        token = request_id.set(current_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (REQUEST_ID_HEADER.encode(), current_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id.reset(token)
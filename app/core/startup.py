@@ -0,0 +1,44 @@
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Wall time of the cold start phases, from the import of the app package to the first request"""
+
+    def __init__(self):
+        self.started = self._last_mark = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self._measured = 0.0  # time of the steps measured since the last mark
+
+    def mark(self, phase: str):
+        # Ends a phase started at the previous mark, minus the steps measured separately within it
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last_mark - self._measured
+        self._last_mark = now
+        self._measured = 0.0
+
+    @contextmanager
+    def measure(self, step: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[step] = time.perf_counter() - started
+            self._measured += self.phases[step]
+
+    def report(self):
+        total = time.perf_counter() - self.started
+        phases = {phase: round(seconds * 1000, 1) for phase, seconds in self.phases.items()}
+        logger.info(
+            "Started in %.0f ms: %s",
+            total * 1000,
+            ", ".join(f"{phase} {ms:.0f} ms" for phase, ms in phases.items()),
+            extra={"startup_ms": phases, "total_ms": round(total * 1000, 1)},
+        )
+
+
+# Started by app/__init__.py, before the app's dependencies are imported
+startup_timer = StartupTimer()
@@ -1,23 +1,65 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from pathlib import Path
+
 from fastapi import FastAPI
-from scalar_fastapi import get_scalar_api_reference
+from fastapi.responses import PlainTextResponse
 
+from app.core.logging import RequestIdMiddleware, configure_logging, stop_logging
 from app.core.settings import settings
+from app.core.startup import startup_timer
 from app.router.auth import auth_router
 from app.router.books import books_router
 from app.router.borrowing_records import borrow_router
 from app.router.members import members_router
+from app.router.stats import stats_router
+from app.services.overdue import run_overdue_sweeper
+from app.utils.admission import AdmissionControlMiddleware
+from app.utils.compression import CompressionMiddleware
+from app.utils.metrics import MetricsMiddleware, render_metrics
+from app.utils.openapi import build_openapi_schema, load_openapi_schema
+from app.utils.serialization import PydanticJSONResponse
+
+startup_timer.mark("imports")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_timer.mark("server setup")  # between the app import and the lifespan, e.g. uvicorn binding its socket
+    log_listener = configure_logging()
+    sweeper = asyncio.create_task(run_overdue_sweeper()) if settings.OVERDUE_SWEEP_INTERVAL_SECONDS > 0 else None
+    startup_timer.mark("lifespan startup")
+    startup_timer.report()
+    yield
+    if sweeper is not None:
+        sweeper.cancel()
+        with suppress(asyncio.CancelledError):
+            await sweeper  # its last records are logged before the listener stops
+    stop_logging(log_listener)
+
 
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.VERSION,
     docs_url=None,
     redoc_url=None,
+    default_response_class=PydanticJSONResponse,  # JSON encoded by pydantic-core rather than the stdlib json module
+    lifespan=lifespan,
 )
 
+app.add_middleware(AdmissionControlMiddleware)  # innermost, shed requests are still counted and logged
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)  # added last = runs first, so everything below logs with the request id
+
+startup_timer.mark("app creation")
+
 app.include_router(router=auth_router)
 app.include_router(router=books_router)
 app.include_router(router=borrow_router)
 app.include_router(router=members_router)
+app.include_router(router=stats_router)
+startup_timer.mark("router registration")
 
 
 @app.get("/")
@@ -25,10 +67,38 @@ def root():
     return {
         "message": "Library Management API",
         "docs": "/scalar",
-        "endpoints": {"books": "/books/", "members": "/members/", "borrowing_records": "/borrowing_records/"},
+        "endpoints": {
+            "books": "/books/",
+            "members": "/members/",
+            "borrowing_records": "/borrowing_records/",
+            "stats": "/stats/",
+        },
     }
 
 
 @app.get(path="/scalar")
 def get_scalar():
+    # Imported on the first docs request, workers that never serve the docs do not pay for it
+    from scalar_fastapi import get_scalar_api_reference
+
     return get_scalar_api_reference(openapi_url=app.openapi_url, title=app.title)
+
+
+def openapi() -> dict:
+    # The schema exported at build time is loaded from disk, instead of being built from every route
+    # and model on the first /openapi.json request of each worker
+    if app.openapi_schema is None:
+        app.openapi_schema = load_openapi_schema(Path(settings.OPENAPI_SCHEMA_PATH)) or build_openapi_schema(app)
+    return app.openapi_schema
+
+
+app.openapi = openapi
+
+
+@app.get(path="/metrics", include_in_schema=False)
+def get_metrics():
+    # Prometheus text format, per worker process
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+startup_timer.mark("app setup")
@@ -1,8 +1,155 @@
-from sqlmodel import Session, create_engine
+import itertools
+import time
+from contextlib import asynccontextmanager
 
-engine = create_engine(url="sqlite:///database.db")
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.core.settings import settings
+from app.core.startup import startup_timer
+from app.utils.metrics import record_query
 
-def get_db():
-    with Session(bind=engine) as session:
+# Sync drivers in DATABASE_URL are swapped for their asyncio counterpart for the app engine,
+# so the same URL keeps working for Alembic and the scripts (sync) and for the API (async).
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # PRAGMAs are per connection, so they are applied each time the pool opens a new one.
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}")
+    cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # A single value: statements on a connection run one after the other. One that fails never reaches
+    # after_cursor_execute, its start time is overwritten by the next statement instead of piling up.
+    conn.info["query_started_at"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record_query(statement, parameters, time.perf_counter() - conn.info.pop("query_started_at"))
+
+
+def _engine_options(database_url: URL) -> dict:
+    options = {"echo": settings.DB_ECHO, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+
+    # In-memory SQLite uses a single-connection pool that does not accept sizing options.
+    # Every other database (file SQLite, Postgres, ...) gets a QueuePool sized from settings.
+    if not (database_url.get_backend_name() == "sqlite" and database_url.database in (None, "", ":memory:")):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    return options
+
+
+def to_async_url(url: str) -> URL:
+    database_url = make_url(url)
+    return database_url.set(drivername=ASYNC_DRIVERS.get(database_url.drivername, database_url.drivername))
+
+
+def build_engine(url: str = settings.DATABASE_URL):
+    # Sync engine for scripts and migrations, the API itself uses build_async_engine().
+    database_url = make_url(url)
+    new_engine = create_engine(url=database_url, **_engine_options(database_url))
+    if database_url.get_backend_name() == "sqlite":
+        event.listen(new_engine, "connect", _set_sqlite_pragmas)
+    return new_engine
+
+
+def build_async_engine(url: str = settings.DATABASE_URL):
+    database_url = to_async_url(url)
+    new_engine = create_async_engine(database_url, **_engine_options(database_url))
+    if database_url.get_backend_name() == "sqlite":
+        # Connection events are fired by the sync engine that the async engine wraps.
+        event.listen(new_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    # Statement count and timing per request, for /metrics, Server-Timing and the slow query log
+    event.listen(new_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(new_engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    return new_engine
+
+
+def build_sessionmaker(bind):
+    # expire_on_commit=False: attributes stay loaded after commit, an expired attribute would need
+    # an implicit (blocking) refresh which AsyncSession does not allow.
+    return async_sessionmaker(bind=bind, class_=AsyncSession, expire_on_commit=False)
+
+
+class ReadRouter:
+    """Hands out read-only sessions on the replicas, or on the primary when none is configured"""
+
+    def __init__(self, engines: list, selection: str = "round_robin"):
+        self.sessionmakers = [build_sessionmaker(replica) for replica in engines]
+        self.selection = selection
+        self.in_flight = [0] * len(engines)  # open sessions per replica, all in this worker's event loop
+        self._turn = itertools.count()
+
+    def _pick(self) -> int:
+        start = next(self._turn) % len(self.sessionmakers)
+        if self.selection != "least_busy":
+            return start
+        # Ties are broken in round-robin order, so idle replicas share the load instead of the first one taking it all
+        order = [(start + offset) % len(self.sessionmakers) for offset in range(len(self.sessionmakers))]
+        return min(order, key=self.in_flight.__getitem__)
+
+    @asynccontextmanager
+    async def session(self):
+        index = self._pick()
+        self.in_flight[index] += 1
+        try:
+            async with self.sessionmakers[index]() as session:
+                yield session
+        finally:
+            self.in_flight[index] -= 1
+
+
+with startup_timer.measure("engine creation"):
+    engine = build_async_engine()  # the primary, every write goes here
+    read_engines = [build_async_engine(url) for url in settings.DATABASE_READ_URLS]
+
+SessionLocal = build_sessionmaker(engine)
+read_router = ReadRouter(read_engines or [engine], settings.DB_READ_SELECTION)
+
+# Set on the response after a commit when replicas are configured. Replicas lag behind the primary,
+# so the client's reads follow its writes to the primary until they had time to catch up.
+READ_PRIMARY_COOKIE = "read_primary"
+
+
+async def get_write_db(response: Response):
+    async with SessionLocal() as session:
+        if read_engines:
+
+            def stick_to_primary(_session):
+                response.set_cookie(
+                    READ_PRIMARY_COOKIE, "1", max_age=settings.DB_READ_YOUR_WRITES_SECONDS, httponly=True
+                )
+
+            event.listen(session.sync_session, "after_commit", stick_to_primary)
         yield session
+
+
+async def get_read_db(request: Request):
+    # For GET endpoints only, a replica may not have the latest writes of other clients yet
+    if request.cookies.get(READ_PRIMARY_COOKIE):
+        async with SessionLocal() as session:
+            yield session
+    else:
+        async with read_router.session() as session:
+            yield session
+
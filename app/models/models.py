@@ -1,5 +1,6 @@
-from datetime import date
+from datetime import date, datetime
 
+from sqlalchemy import Index, exists, false, text
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -8,75 +9,95 @@ class Book(SQLModel, table=True):
     title: str
     author: str
     published_year: int
-    isbn: str
+    isbn: str = Field(unique=True, index=True)
     borrowing_records: list["BorrowingRecords"] = Relationship(back_populates="book")
 
-    @property
-    def is_available(self) -> bool:
-        # Book is available if:
-        # - It has no borrowing records at all, OR
-        # - All borrowing records have a return_date (meaning the book was returned)
-
-        # Book is NOT available if:
-        # - There's any borrowing record with return_date = None (currently borrowed)
-
-        if not self.borrowing_records:
-            return True  # No borrowing history = available
-
-        # Check if any record has no return date (currently borrowed)
-        return not any(record.return_date is None for record in self.borrowing_records)
-
 
 class Member(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
     name: str
-    email: str
+    email: str = Field(unique=True, index=True)
     borrowing_records: list["BorrowingRecords"] = Relationship(
         back_populates="member",
         cascade_delete=True,  # This will delete all borrowing records when member is deleted
     )
 
-    @property
-    def borrowing_history(self) -> list[dict]:
-        # Returns a list of all borrowing records with book details, borrow and return dates
-        history = []
-        for record in self.borrowing_records:
-            history.append(
-                {
-                    "borrow_id": record.borrow_id,
-                    "book_id": record.book_id,
-                    "book_title": record.book.title if record.book else None,
-                    "borrow_date": record.borrow_date,
-                    "return_date": record.return_date,
-                }
-            )
-        return history
-
-    @property
-    def currently_borrowed_books(self) -> list[dict]:
-        # Returns only books currently borrowed (not yet returned)
-        return [
-            {
-                "borrow_id": record.borrow_id,
-                "book_title": record.book.title if record.book else None,
-                "borrow_date": record.borrow_date,
-                "days_borrowed": (date.today() - record.borrow_date).days,
-            }
-            for record in self.borrowing_records
-            if record.return_date is None
-        ]
-
 
 class BorrowingRecords(SQLModel, table=True):
+    __table_args__ = (
+        # Partial index over open loans only (return_date IS NULL).
+        # It stays small no matter how much history accumulates and answers "is this book out?" with one probe.
+        # Being unique, it also guarantees in the database that a book has at most one open loan.
+        Index(
+            "ix_borrowingrecords_open_loans",
+            "book_id",
+            unique=True,
+            sqlite_where=text("return_date IS NULL"),
+            postgresql_where=text("return_date IS NULL"),
+        ),
+        # Open loans by borrow date: overdue loans are a range at the start of it ("borrowed before the cutoff").
+        # The primary key is implicitly part of the index, which also gives (borrow_date, borrow_id) order.
+        Index(
+            "ix_borrowingrecords_open_loans_borrow_date",
+            "borrow_date",
+            sqlite_where=text("return_date IS NULL"),
+            postgresql_where=text("return_date IS NULL"),
+        ),
+    )
+
     borrow_id: int | None = Field(default=None, primary_key=True)
-    book_id: int = Field(foreign_key="book.id")
-    member_id: int = Field(foreign_key="member.id")
+    book_id: int = Field(foreign_key="book.id", index=True)
+    member_id: int = Field(foreign_key="member.id", index=True)
     borrow_date: date
     return_date: date | None = None
+    # Set by the overdue sweep on open loans past their due date, and on return for late returns
+    is_overdue: bool = Field(default=False, sa_column_kwargs={"server_default": false()})
     book: Book = Relationship(back_populates="borrowing_records")
     member: Member = Relationship(back_populates="borrowing_records")
 
 
+def book_is_available():
+    # Usable in SELECT and WHERE clauses. A book is available when no borrowing record with return_date = NULL
+    # exists for it, so the check runs inside the database instead of loading every book's borrowing_records.
+    return ~exists().where(BorrowingRecords.book_id == Book.id, BorrowingRecords.return_date.is_(None))
+
+
+def member_has_open_loans():
+    # Whether the member has a loan not returned yet, served by the member_id index.
+    return exists().where(BorrowingRecords.member_id == Member.id, BorrowingRecords.return_date.is_(None))
+
+
+class TableVersion(SQLModel, table=True):
+    # One row per cached table, bumped in the same transaction as every write to that table.
+    # Read endpoints derive their ETag / Last-Modified from it instead of from the data itself.
+    name: str = Field(primary_key=True)
+    version: int = 0
+    updated_at: datetime
+
+
+class BookLoanStats(SQLModel, table=True):
+    # Loan counters of one book, kept up to date by app.services.loan_stats in the same transaction as
+    # every checkout and return, so dashboards never have to aggregate borrowingrecords.
+    book_id: int = Field(foreign_key="book.id", primary_key=True)
+    open_loans: int = 0
+    total_loans: int = Field(default=0, index=True)  # indexed for the most borrowed books ranking
+    last_borrowed: date | None = None
+
+
+class MemberLoanStats(SQLModel, table=True):
+    # Same counters per member
+    member_id: int = Field(foreign_key="member.id", primary_key=True)
+    open_loans: int = 0
+    total_loans: int = Field(default=0, index=True)  # indexed for the most active members ranking
+    last_borrowed: date | None = None
+
+
+class LoanCounter(SQLModel, table=True):
+    # Library-wide counters ("total_loans", "open_loans"), one row each
+    name: str = Field(primary_key=True)
+    value: int = 0
+
+
 class User(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
     username: str
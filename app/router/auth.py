@@ -1,54 +1,71 @@
+import logging
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.exc import IntegrityError
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.models.engine import get_db
+from app.models.engine import get_write_db
 from app.models.models import User
 from app.schema.auth import LoginRequest, RegisterRequest
-from app.utils.auth import generate_token, hash_password, is_password_valid
+from app.utils.auth import generate_token, hash_password_async, is_password_valid_async, needs_rehash
 
 auth_router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+logger = logging.getLogger(__name__)
+
 
 @auth_router.post("/register", status_code=status.HTTP_201_CREATED)
-def register_user(body: RegisterRequest, db: Session = Depends(get_db)):
+async def register_user(body: RegisterRequest, db: AsyncSession = Depends(get_write_db)):
+    # Hashing happens on the dedicated bcrypt pool, outside the try block so that its
+    # 503 (pool saturated) reaches the client instead of being turned into a 400.
+    hashed_password = await hash_password_async(body.password)
     try:
-        hashed_password = hash_password(body.password)
         new_user = User(
             username=body.username,
             email=body.email,
             password=hashed_password,
         )
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
     # exception must be handled since the email field has a unique constraint,
     # and trying to register with an existing email will raise an IntegrityError.
     # We catch this specific error to return a user-friendly message,
     # while also catching any other unexpected exceptions that may occur during the registration process.
     # if exceptions are not handled, the API will return a generic 500 Internal Server Error,
     # which is not informative for the client and does not provide a good user experience.
-    except IntegrityError as e:
-        print(e, "User already exist!")  # Log the error for debugging purposes
+    except IntegrityError:
+        # The exception is not logged as is: its SQL parameters include the password hash
+        logger.info("Registration rejected, email already registered")
         # This error occurs when trying to insert a duplicate email due to the unique constraint
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User already exist!")
-    except Exception as e:
-        print(e)  # Log the error for debugging purposes
+    except Exception:
+        logger.exception("Registration failed")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Bad request")
 
     return {"success": True, "message": "User registered successfully"}
 
 
 @auth_router.post("/login")
-def login_user(body: LoginRequest, db: Session = Depends(get_db)):
-    user = db.exec(select(User).where(User.email == body.email)).first()
+async def login_user(body: LoginRequest, db: AsyncSession = Depends(get_write_db)):
+    user = (await db.exec(select(User).where(User.email == body.email))).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
-    if not is_password_valid(body.password, user.password):
+    if not await is_password_valid_async(body.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     # beetwen the two cases, the user is not found or the password is incorrect,
     # we return the same error message to avoid giving hints to potential attackers
     # about which part of the credentials is wrong (UX Security).
-    token = generate_token({"id": user.id})
+
+    # The password was just verified, so this is the only moment it can be re-hashed
+    # when BCRYPT_ROUNDS changed since the hash was stored.
+    if needs_rehash(user.password):
+        user.password = await hash_password_async(body.password)
+        db.add(user)
+        await db.commit()
+
+    # username and email let get_current_user skip the database when AUTH_TRUST_TOKEN_CLAIMS is enabled
+    token = generate_token({"id": user.id, "username": user.username, "email": user.email})
     return {"success": True, "message": "Login successful", "token": token}
@@ -1,41 +1,127 @@
-from fastapi import APIRouter, Depends, status
-from sqlmodel import Session, select
+import logging
 
-from app.models.engine import get_db
-from app.models.models import Book, User
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.engine import get_read_db, get_write_db
+from app.models.models import Book, book_is_available
+from app.schema.auth import CurrentUser
 from app.schema.book import BookRequest, BookResponse
+from app.schema.bulk_import import BulkImportResponse
+from app.schema.pagination import Page
 from app.services.auth import get_current_user
+from app.services.bulk_import import import_records, parse_records
+from app.services.http_cache import bump_table_versions
+from app.services.response_cache import CachedRead, cached_read, response_cache
+from app.services.search import apply_search, search_terms, uses_fts
+from app.utils.pagination import build_page, decode_cursor, encode_cursor, page_limit, paginate
 
 books_router = APIRouter(prefix="/books", tags=["Books"])
 
+logger = logging.getLogger(__name__)
+
+
+def select_book_responses():
+    # Select exactly the BookResponse columns, with is_available computed by the database.
+    # Rows are validated straight into BookResponse, so no Book instances (and no lazy loads) are created.
+    return select(
+        Book.id,
+        Book.title,
+        Book.author,
+        Book.isbn,
+        Book.published_year,
+        book_is_available().label("is_available"),
+    )
 
-@books_router.get(path="/", response_model=list[BookResponse])
-def get_books(
-    is_available: bool | None = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+
+# is_available depends on borrowingrecords, so both tables take part in the ETag and cache key.
+# get_current_user is listed first so that a 304 or a cached page is never sent to an unauthenticated client.
+@books_router.get(path="/", response_model=Page[BookResponse], dependencies=[Depends(get_current_user)])
+async def get_books(
+    is_available: bool | None = None,
+    cursor: str | None = None,
+    limit: int = Depends(page_limit),
+    cache: CachedRead = Depends(cached_read("book", "borrowingrecords")),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    print(f"User {current_user.username} is accessing the books endpoint.")
-    query = select(Book)
-    books = db.exec(query).all()
+    logger.debug("User is accessing the books endpoint", extra={"user_id": current_user.id})
+    if (cached := cache.lookup()) is not None:
+        return cached
+
+    query = select_book_responses()
 
     if is_available is not None:
-        books = [book for book in books if book.is_available == is_available]
+        query = query.where(book_is_available() if is_available else ~book_is_available())
 
-    return books
+    books = (await db.exec(paginate(query, Book.id, cursor, limit))).all()
+
+    return cache.store(Page[BookResponse], build_page(books, limit, key="id"), tags=["books"])
+
+
+@books_router.get(path="/search", response_model=Page[BookResponse])
+async def search_books(
+    q: str = Query(min_length=1, description="Words to look for in the title, author or ISBN"),
+    cursor: str | None = None,
+    limit: int = Depends(page_limit),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    terms = search_terms(q)
+    if not terms:
+        return {"items": [], "next_cursor": None}
+
+    # Results are ordered by relevance, not by id, so the cursor carries an offset into the ranking.
+    offset = decode_cursor(cursor) if cursor is not None else 0
+    query = apply_search(select_book_responses(), terms, fts=uses_fts(db))
+    books = (await db.exec(query.offset(offset).limit(limit + 1))).all()
+
+    next_cursor = encode_cursor(offset + limit) if len(books) > limit else None
+    return {"items": books[:limit], "next_cursor": next_cursor}
 
 
 @books_router.get(path="/{id}", response_model=BookResponse)
-def get_book_by_id(id: int, db: Session = Depends(get_db)):
-    book = db.get(Book, id)
-    return book
+async def get_book_by_id(
+    id: int,
+    cache: CachedRead = Depends(cached_read("book", "borrowingrecords")),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if (cached := cache.lookup()) is not None:
+        return cached
+
+    book = (await db.exec(select_book_responses().where(Book.id == id))).first()
+    if not book:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+
+    return cache.store(BookResponse, book, tags=[f"book:{id}"])
 
 
 @books_router.post(
     path="/",
     status_code=status.HTTP_201_CREATED,
 )
-def create_book(body: BookRequest, db: Session = Depends(get_db)):
+async def create_book(body: BookRequest, db: AsyncSession = Depends(get_write_db)):
     new_book = Book(**body.model_dump())
     db.add(new_book)
-    db.commit()
-    db.refresh(new_book)  # Get the ID and computed properties
+    try:
+        await bump_table_versions(db, "book")  # flushes the INSERT, which may hit the unique ISBN index
+        await db.commit()
+    except IntegrityError:
+        # book.isbn has a unique index
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Book with this ISBN already exists")
+    response_cache.invalidate("books")
+    await db.refresh(new_book)  # Get the ID and computed properties
     return new_book
+
+
+@books_router.post(path="/bulk", response_model=BulkImportResponse)
+async def bulk_create_books(request: Request, db: AsyncSession = Depends(get_write_db)):
+    # Accepts a JSON array (application/json), NDJSON (application/x-ndjson) or CSV with a header row (text/csv).
+    # NDJSON and CSV are parsed while the body is still streaming in.
+    records = parse_records(request.stream(), request.headers.get("content-type", "application/json"))
+    report = await import_records(db, Book, BookRequest, records, unique_field="isbn")
+    response_cache.invalidate("books")
+
+    return report
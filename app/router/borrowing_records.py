@@ -1,60 +1,226 @@
-from datetime import date
+from datetime import date, timedelta
+from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import exists, insert, literal, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.models.engine import get_db
-from app.models.models import Book, BorrowingRecords, Member
-from app.schema.borrowing_record import BorrowingRecordRequest, BorrowingRecordResponse, UpdateBorrowingRecordRequest
+from app.core.settings import settings
+from app.models.engine import get_read_db, get_write_db
+from app.models.models import Book, BorrowingRecords, Member, book_is_available
+from app.schema.borrowing_record import (
+    BatchCheckoutRequest,
+    BatchResponse,
+    BatchReturnRequest,
+    BorrowingRecordRequest,
+    BorrowingRecordResponse,
+    OverdueLoanResponse,
+    UpdateBorrowingRecordRequest,
+)
+from app.schema.pagination import Page
+from app.services.circulation import batch_response, checkout_batch, return_batch
+from app.services.export import EXPORT_MEDIA_TYPES, stream_rows
+from app.services.http_cache import bump_table_versions
+from app.services.loan_stats import overdue_before, record_checkouts, record_returns
+from app.services.overdue import overdue_loans
+from app.services.response_cache import response_cache
+from app.utils.pagination import build_page, decode_date_cursor, page_limit, paginate
+from app.utils.serialization import json_response
 
 borrow_router = APIRouter(prefix="/borrowing_records", tags=["Borrowing Records"])
 
 
-@borrow_router.get(path="/", response_model=list[BorrowingRecordResponse])
-def get_borrowing_records(db: Session = Depends(get_db)):
-    query = select(BorrowingRecords)
-    books = db.exec(query).all()
+@borrow_router.get(path="/", response_model=Page[BorrowingRecordResponse])
+async def get_borrowing_records(
+    cursor: str | None = None, limit: int = Depends(page_limit), db: AsyncSession = Depends(get_read_db)
+):
+    # Only the response columns are selected and the rows are rendered straight to JSON,
+    # no BorrowingRecords instances are built for a read-only page.
+    query = select(
+        BorrowingRecords.borrow_id,
+        BorrowingRecords.book_id,
+        BorrowingRecords.member_id,
+        BorrowingRecords.borrow_date,
+        BorrowingRecords.return_date,
+        BorrowingRecords.is_overdue,
+    )
+    records = (await db.exec(paginate(query, BorrowingRecords.borrow_id, cursor, limit))).all()
+
+    return json_response(Page[BorrowingRecordResponse], build_page(records, limit, key="borrow_id"))
+
+
+@borrow_router.get(path="/overdue", response_model=Page[OverdueLoanResponse])
+async def get_overdue_loans(
+    min_days_overdue: int = Query(default=0, ge=0, description="Only loans at least this many days past due"),
+    cursor: str | None = None,
+    limit: int = Depends(page_limit),
+    db: AsyncSession = Depends(get_read_db),
+):
+    # Oldest loans first. The date range is answered by the open-loans borrow_date index, whatever
+    # the size of the history, and the index order (borrow_date, borrow_id) is also the page order.
+    cutoff = overdue_before() - timedelta(days=min_days_overdue)
+    query = (
+        select(
+            BorrowingRecords.borrow_id,
+            BorrowingRecords.book_id,
+            Book.title.label("book_title"),
+            BorrowingRecords.member_id,
+            Member.name.label("member_name"),
+            Member.email.label("member_email"),
+            BorrowingRecords.borrow_date,
+        )
+        .join(Book, Book.id == BorrowingRecords.book_id)
+        .join(Member, Member.id == BorrowingRecords.member_id)
+        .where(*overdue_loans(cutoff))
+        .order_by(BorrowingRecords.borrow_date, BorrowingRecords.borrow_id)
+        .limit(limit + 1)
+    )
+    if cursor is not None:
+        # The cursor holds the (borrow_date, borrow_id) of the previous page's last loan, so the page
+        # continues at the right place even if that loan was deleted in between.
+        after_date, after_id = decode_date_cursor(cursor)
+        query = query.where(
+            tuple_(BorrowingRecords.borrow_date, BorrowingRecords.borrow_id) > tuple_(after_date, after_id)
+        )
+    page = build_page((await db.exec(query)).all(), limit, key=("borrow_date", "borrow_id"))
+
+    today = date.today()
+    page["items"] = [
+        {
+            **row._mapping,
+            "due_date": row.borrow_date + timedelta(days=settings.LOAN_PERIOD_DAYS),
+            "days_overdue": (today - row.borrow_date).days - settings.LOAN_PERIOD_DAYS,
+        }
+        for row in page["items"]
+    ]
+    return json_response(Page[OverdueLoanResponse], page)
+
+
+@borrow_router.get(path="/export")
+async def export_borrowing_records(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    borrowed_from: date | None = None,
+    borrowed_to: date | None = None,
+    member_id: int | None = None,
+    book_id: int | None = None,
+):
+    # Streams every matching record, for reporting jobs that need more than a page.
+    query = select(
+        BorrowingRecords.borrow_id,
+        BorrowingRecords.book_id,
+        BorrowingRecords.member_id,
+        BorrowingRecords.borrow_date,
+        BorrowingRecords.return_date,
+    ).order_by(BorrowingRecords.borrow_id)
+
+    if borrowed_from is not None:
+        query = query.where(BorrowingRecords.borrow_date >= borrowed_from)
+    if borrowed_to is not None:
+        query = query.where(BorrowingRecords.borrow_date <= borrowed_to)
+    if member_id is not None:
+        query = query.where(BorrowingRecords.member_id == member_id)
+    if book_id is not None:
+        query = query.where(BorrowingRecords.book_id == book_id)
 
-    return books
+    return StreamingResponse(
+        stream_rows(query, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="borrowing_records.{format}"'},
+    )
 
 
 @borrow_router.post(
     path="/",
     status_code=status.HTTP_201_CREATED,
 )
-def create_borrowing_record(body: BorrowingRecordRequest, db: Session = Depends(get_db)):
-    # 1. Check if book exists
-    book = db.get(Book, body.book_id)
-    if not book:
-        raise HTTPException(status_code=404, detail="Book not found")
+async def create_borrowing_record(body: BorrowingRecordRequest, db: AsyncSession = Depends(get_write_db)):
+    # 1. Create the borrowing record in a single conditional INSERT ... SELECT.
+    # The row is only inserted when the book exists, the member exists and the book has no open loan,
+    # so checking and borrowing cannot be interleaved by another request.
+    checkout = (
+        insert(BorrowingRecords)
+        .from_select(
+            ["book_id", "member_id", "borrow_date"],
+            select(Book.id, literal(body.member_id), literal(date.today())).where(  # ✅ Set today's date automatically
+                Book.id == body.book_id,
+                book_is_available(),
+                exists().where(Member.id == body.member_id),
+            ),
+        )
+        .returning(
+            BorrowingRecords.borrow_id,
+            BorrowingRecords.book_id,
+            BorrowingRecords.member_id,
+            BorrowingRecords.borrow_date,
+            BorrowingRecords.return_date,
+        )
+    )
+    try:
+        new_record = (await db.exec(checkout)).first()
+        if new_record is not None:
+            await record_checkouts(db, [(new_record.book_id, new_record.member_id, new_record.borrow_date)])
+            await bump_table_versions(db, "borrowingrecords")
+        await db.commit()
+    except IntegrityError:
+        # The unique open-loan index rejected a concurrent checkout of the same book that
+        # passed the availability check at the same time (possible outside SQLite).
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Book is currently borrowed")
 
-    # 2. Check if book is available
-    if not book.is_available:
-        raise HTTPException(status_code=400, detail="Book is currently borrowed")
+    if new_record is not None:
+        # The book is no longer available and the member has one more loan
+        response_cache.invalidate("books", f"book:{body.book_id}", f"member:{body.member_id}", "stats")
+        return {
+            "success": True,
+            "data": BorrowingRecordResponse.model_validate(new_record),
+            "message": "Borrowing record created successfully",
+        }
 
-    # 3. Check if member exists
-    member = db.get(Member, body.member_id)
-    if not member:
+    # 2. Nothing was inserted, find out why (only failed checkouts pay for this query)
+    book_exists, member_exists = (
+        await db.exec(select(exists().where(Book.id == body.book_id), exists().where(Member.id == body.member_id)))
+    ).one()
+    if not book_exists:
+        raise HTTPException(status_code=404, detail="Book not found")
+    if not member_exists:
         raise HTTPException(status_code=404, detail="Member not found")
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Book is currently borrowed")
 
-    # 4. Create borrowing record
-    new_record = BorrowingRecords(
-        book_id=body.book_id,
-        member_id=body.member_id,
-        borrow_date=date.today(),  # ✅ Set today's date automatically
-    )
 
-    db.add(new_record)
-    db.commit()
-    db.refresh(new_record)
+@borrow_router.post(path="/batch", response_model=BatchResponse)
+async def create_borrowing_records(body: BatchCheckoutRequest, db: AsyncSession = Depends(get_write_db)):
+    # Checks out up to BATCH_MAX_ITEMS books in one transaction. Every item gets the status the single
+    # POST would have answered (201, 404 or 409), a failed item does not prevent the others.
+    results = await checkout_batch(db, body.items)
 
-    return {"success": True, "data": new_record, "message": "Borrowing record created successfully"}
+    created = [result["data"] for result in results if result["success"]]
+    if created:
+        tags = {tag for record in created for tag in (f"book:{record.book_id}", f"member:{record.member_id}")}
+        response_cache.invalidate("books", "stats", *tags)
+    return batch_response(results)
+
+
+@borrow_router.patch(path="/batch", response_model=BatchResponse)  # declared before /{borrow_id}
+async def return_borrowing_records(body: BatchReturnRequest, db: AsyncSession = Depends(get_write_db)):
+    # Returns up to BATCH_MAX_ITEMS loans in one transaction, each item defaults to today as return date.
+    results = await return_batch(db, body.items)
+
+    returned = [result["data"] for result in results if result["success"]]
+    if returned:
+        tags = {tag for record in returned for tag in (f"book:{record.book_id}", f"member:{record.member_id}")}
+        response_cache.invalidate("books", "stats", *tags)
+    return batch_response(results)
 
 
 @borrow_router.patch(path="/{borrow_id}")
-def update_borrowing_record(borrow_id: int, body: UpdateBorrowingRecordRequest, db: Session = Depends(get_db)):
+async def update_borrowing_record(
+    borrow_id: int, body: UpdateBorrowingRecordRequest, db: AsyncSession = Depends(get_write_db)
+):
     # 1. Check if borrowing record exists
-    record = db.get(BorrowingRecords, borrow_id)
+    record = await db.get(BorrowingRecords, borrow_id)
     if not record:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Borrowing record not found")
 
@@ -66,11 +232,25 @@ def update_borrowing_record(borrow_id: int, body: UpdateBorrowingRecordRequest,
     if body.return_date and body.return_date < record.borrow_date:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Return date cannot be before borrow date")
 
-    # 4. Update the record
-    record.return_date = body.return_date
+    # 4. Update the record, only if it is still open: of two concurrent returns, one updates no row
+    # and the loan counters are decremented once.
+    changes = {"return_date": body.return_date}
+    if body.return_date is not None and (body.return_date - record.borrow_date).days > settings.LOAN_PERIOD_DAYS:
+        changes["is_overdue"] = True  # late return, even if the sweep never saw the loan open past its due date
+    returned = await db.exec(
+        update(BorrowingRecords)
+        .where(BorrowingRecords.borrow_id == borrow_id, BorrowingRecords.return_date.is_(None))
+        .values(**changes)
+    )
+    if returned.rowcount == 0:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Book has already been returned")
 
-    db.add(record)
-    db.commit()
-    db.refresh(record)
+    if body.return_date is not None:
+        await record_returns(db, [(record.book_id, record.member_id)])
+    await bump_table_versions(db, "borrowingrecords")
+    await db.commit()
+    response_cache.invalidate("books", f"book:{record.book_id}", f"member:{record.member_id}", "stats")
+    await db.refresh(record)
 
     return {"success": True, "data": record, "message": "Book returned successfully"}
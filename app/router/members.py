@@ -1,54 +1,166 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
-
-from app.models.engine import get_db
-from app.models.models import Member
-from app.schema.member import MemberDetailResponse, MemberRequest, MemberResponse
+from datetime import date, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.settings import settings
+from app.models.engine import get_read_db, get_write_db
+from app.models.models import Book, BorrowingRecords, Member, member_has_open_loans
+from app.schema.bulk_import import BulkImportResponse
+from app.schema.member import (
+    BorrowingHistoryItem,
+    CurrentlyBorrowedBook,
+    MemberDetailResponse,
+    MemberRequest,
+    MemberResponse,
+)
+from app.schema.pagination import Page
+from app.services.bulk_import import import_records, parse_records
+from app.services.http_cache import bump_table_versions
+from app.services.loan_stats import forget_member
+from app.services.response_cache import CachedRead, cached_read, response_cache
+from app.utils.pagination import build_page, page_limit, paginate
 
 members_router = APIRouter(prefix="/members", tags=["Members"])
 
 
-@members_router.get(path="/", response_model=list[MemberResponse])
-def get_members(db: Session = Depends(get_db)):
+@members_router.get(path="/", response_model=Page[MemberResponse])
+async def get_members(
+    cursor: str | None = None,
+    limit: int = Depends(page_limit),
+    cache: CachedRead = Depends(cached_read("member")),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if (cached := cache.lookup()) is not None:
+        return cached
+
     query = select(Member)
-    members = db.exec(query).all()
+    members = (await db.exec(paginate(query, Member.id, cursor, limit))).all()
 
-    return members
+    return cache.store(Page[MemberResponse], build_page(members, limit, key="id"), tags=["members"])
 
 
+# days_borrowed and is_overdue change every day even when no table does, hence daily=True
 @members_router.get(path="/{id}", response_model=MemberDetailResponse)
-def get_member_by_id(id: int, db: Session = Depends(get_db)):
-    member = db.get(Member, id)
+async def get_member_by_id(
+    id: int,
+    cache: CachedRead = Depends(cached_read("member", "borrowingrecords", "book", daily=True)),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if (cached := cache.lookup()) is not None:
+        return cached
+
+    # One query for the member, every borrowing record and each record's book title.
+    # The outer joins keep the member row even when it has never borrowed anything.
+    query = (
+        select(
+            Member.id,
+            Member.name,
+            Member.email,
+            BorrowingRecords.borrow_id,
+            BorrowingRecords.book_id,
+            Book.title,
+            BorrowingRecords.borrow_date,
+            BorrowingRecords.return_date,
+        )
+        .select_from(Member)
+        .outerjoin(BorrowingRecords, BorrowingRecords.member_id == Member.id)
+        .outerjoin(Book, Book.id == BorrowingRecords.book_id)
+        .where(Member.id == id)
+        .order_by(BorrowingRecords.borrow_id)
+    )
+    rows = (await db.exec(query)).all()
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Member not found")
 
-    return member
+    # Both lists are built in a single pass over the rows.
+    today = date.today()
+    loan_period = timedelta(days=settings.LOAN_PERIOD_DAYS)
+    borrowing_history = []
+    currently_borrowed_books = []
+    for row in rows:
+        if row.borrow_id is None:
+            continue  # member without borrowing records
+
+        borrowing_history.append(
+            BorrowingHistoryItem(
+                borrow_id=row.borrow_id,
+                book_id=row.book_id,
+                book_title=row.title,
+                borrow_date=row.borrow_date,
+                return_date=row.return_date,
+            )
+        )
+        if row.return_date is None:
+            currently_borrowed_books.append(
+                CurrentlyBorrowedBook(
+                    borrow_id=row.borrow_id,
+                    book_title=row.title,
+                    borrow_date=row.borrow_date,
+                    days_borrowed=(today - row.borrow_date).days,
+                    due_date=row.borrow_date + loan_period,
+                    is_overdue=row.borrow_date < today - loan_period,
+                )
+            )
+
+    member = rows[0]
+    detail = MemberDetailResponse(
+        id=member.id,
+        name=member.name,
+        email=member.email,
+        borrowing_history=borrowing_history,
+        currently_borrowed_books=currently_borrowed_books,
+    )
+    return cache.store(MemberDetailResponse, detail, tags=[f"member:{id}"])
 
 
 @members_router.post(path="/", status_code=status.HTTP_201_CREATED, response_model=MemberResponse)
-def create_member(body: MemberRequest, db: Session = Depends(get_db)):
+async def create_member(body: MemberRequest, db: AsyncSession = Depends(get_write_db)):
     new_member = Member(**body.model_dump())
     db.add(new_member)
-    db.commit()
-    db.refresh(new_member)  # Get the ID and computed properties
+    try:
+        await bump_table_versions(db, "member")  # flushes the INSERT, which may hit the unique email index
+        await db.commit()
+    except IntegrityError:
+        # member.email has a unique index
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Member with this email already exists")
+    response_cache.invalidate("members")
+    await db.refresh(new_member)  # Get the ID and computed properties
 
     return new_member
 
 
+@members_router.post(path="/bulk", response_model=BulkImportResponse)
+async def bulk_create_members(request: Request, db: AsyncSession = Depends(get_write_db)):
+    # Same formats as POST /books/bulk: JSON array, NDJSON or CSV with a header row.
+    records = parse_records(request.stream(), request.headers.get("content-type", "application/json"))
+    report = await import_records(db, Member, MemberRequest, records, unique_field="email")
+    response_cache.invalidate("members")
+
+    return report
+
+
 @members_router.delete("/{id}")
-def delete_member(id: int, db: Session = Depends(get_db)):
-    member = db.get(Member, id)
+async def delete_member(id: int, db: AsyncSession = Depends(get_write_db)):
+    member = await db.get(Member, id)
     if not member:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Member not found")
 
-    # Check if member has unreturned books using the property
-    if len(member.currently_borrowed_books) > 0:
+    # Check if member has unreturned books (an index probe instead of loading the member's borrowing history)
+    if (await db.exec(select(member_has_open_loans()).where(Member.id == id))).one():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot delete member. Member still has unreturned book(s).",
         )
 
-    # Member can be deleted (no unreturned books)
-    db.delete(member)
-    db.commit()
+    # Member can be deleted (no unreturned books), its past loans leave the counters with it
+    await forget_member(db, id)
+    await db.delete(member)
+    await bump_table_versions(db, "member", "borrowingrecords")  # the member's records are deleted with it
+    await db.commit()
+    response_cache.invalidate("members", f"member:{id}", "stats")
 
     return {
         "success": True,
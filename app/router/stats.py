@@ -0,0 +1,114 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.settings import settings
+from app.models.engine import get_read_db
+from app.models.models import Book, BookLoanStats, LoanCounter, Member, MemberLoanStats
+from app.schema.stats import BookLoanStatsResponse, LoanSummary, MemberLoanStatsResponse
+from app.services.auth import get_current_user
+from app.services.loan_stats import overdue_before
+from app.services.overdue import overdue_loans
+from app.services.response_cache import CachedRead, cached_read
+
+# Dashboards read the counters maintained by app.services.loan_stats, never aggregate borrowingrecords.
+# Router-level dependencies run first, so a cached response or a 304 is never sent to an unauthenticated client.
+stats_router = APIRouter(prefix="/stats", tags=["Statistics"], dependencies=[Depends(get_current_user)])
+
+
+def select_book_stats(isouter: bool = True):
+    # Books that were never borrowed have no counters row, they get zeros
+    return select(
+        Book.id.label("book_id"),
+        Book.title,
+        Book.author,
+        func.coalesce(BookLoanStats.open_loans, 0).label("open_loans"),
+        func.coalesce(BookLoanStats.total_loans, 0).label("total_loans"),
+        BookLoanStats.last_borrowed,
+    ).join(BookLoanStats, BookLoanStats.book_id == Book.id, isouter=isouter)
+
+
+def select_member_stats(isouter: bool = True):
+    return select(
+        Member.id.label("member_id"),
+        Member.name,
+        Member.email,
+        func.coalesce(MemberLoanStats.open_loans, 0).label("open_loans"),
+        func.coalesce(MemberLoanStats.total_loans, 0).label("total_loans"),
+        MemberLoanStats.last_borrowed,
+    ).join(MemberLoanStats, MemberLoanStats.member_id == Member.id, isouter=isouter)
+
+
+# overdue_loans depends on today's date, hence daily=True
+@stats_router.get(path="/", response_model=LoanSummary)
+async def get_loan_summary(
+    cache: CachedRead = Depends(cached_read("borrowingrecords", daily=True)),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if (cached := cache.lookup()) is not None:
+        return cached
+
+    counters = dict((await db.exec(select(LoanCounter.name, LoanCounter.value))).all())
+    # Counted live from the open-loans borrow_date index (a range scan), not from the sweep's flags
+    overdue_count = (await db.exec(select(func.count()).where(*overdue_loans(overdue_before())))).one()
+
+    summary = {
+        "total_loans": counters.get("total_loans", 0),
+        "open_loans": counters.get("open_loans", 0),
+        "overdue_loans": overdue_count,
+        "loan_period_days": settings.LOAN_PERIOD_DAYS,
+    }
+    return cache.store(LoanSummary, summary, tags=["stats"])
+
+
+@stats_router.get(path="/books", response_model=list[BookLoanStatsResponse])
+async def get_most_borrowed_books(
+    limit: int = Query(default=10, ge=1, le=100),
+    cache: CachedRead = Depends(cached_read("book", "borrowingrecords")),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if (cached := cache.lookup()) is not None:
+        return cached
+
+    # Walks the total_loans index from the top (ties by descending id, the index order), the join only
+    # touches the returned books
+    query = (
+        select_book_stats(isouter=False)
+        .order_by(BookLoanStats.total_loans.desc(), BookLoanStats.book_id.desc())
+        .limit(limit)
+    )
+    return cache.store(list[BookLoanStatsResponse], (await db.exec(query)).all(), tags=["stats"])
+
+
+@stats_router.get(path="/members", response_model=list[MemberLoanStatsResponse])
+async def get_most_active_members(
+    limit: int = Query(default=10, ge=1, le=100),
+    cache: CachedRead = Depends(cached_read("member", "borrowingrecords")),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if (cached := cache.lookup()) is not None:
+        return cached
+
+    query = (
+        select_member_stats(isouter=False)
+        .order_by(MemberLoanStats.total_loans.desc(), MemberLoanStats.member_id.desc())
+        .limit(limit)
+    )
+    return cache.store(list[MemberLoanStatsResponse], (await db.exec(query)).all(), tags=["stats"])
+
+
+@stats_router.get(path="/books/{id}", response_model=BookLoanStatsResponse)
+async def get_book_stats(id: int, db: AsyncSession = Depends(get_read_db)):
+    book = (await db.exec(select_book_stats().where(Book.id == id))).first()
+    if not book:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+    return book
+
+
+@stats_router.get(path="/members/{id}", response_model=MemberLoanStatsResponse)
+async def get_member_stats(id: int, db: AsyncSession = Depends(get_read_db)):
+    member = (await db.exec(select_member_stats().where(Member.id == id))).first()
+    if not member:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Member not found")
+    return member
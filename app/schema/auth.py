@@ -10,3 +10,12 @@ class RegisterRequest(BaseModel):
 class LoginRequest(BaseModel):
     email: str
     password: str
+
+
+class CurrentUser(BaseModel):
+    id: int
+    username: str
+    email: str
+
+    class Config:
+        from_attributes = True
@@ -1,6 +1,8 @@
 from datetime import date
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from app.core.settings import settings
 
 
 class BorrowingRecordRequest(BaseModel):
@@ -14,10 +16,51 @@ class BorrowingRecordResponse(BaseModel):
     member_id: int
     borrow_date: date
     return_date: date | None = None
+    is_overdue: bool = False
 
     class Config:
         from_attributes = True
 
 
+class OverdueLoanResponse(BaseModel):
+    borrow_id: int
+    book_id: int
+    book_title: str
+    member_id: int
+    member_name: str
+    member_email: str
+    borrow_date: date
+    due_date: date
+    days_overdue: int
+
+
 class UpdateBorrowingRecordRequest(BaseModel):
     return_date: date | None = None
+
+
+class ReturnRequest(BaseModel):
+    borrow_id: int
+    return_date: date = Field(default_factory=date.today)
+
+
+class BatchCheckoutRequest(BaseModel):
+    items: list[BorrowingRecordRequest] = Field(min_length=1, max_length=settings.BATCH_MAX_ITEMS)
+
+
+class BatchReturnRequest(BaseModel):
+    items: list[ReturnRequest] = Field(min_length=1, max_length=settings.BATCH_MAX_ITEMS)
+
+
+class BatchItemResult(BaseModel):
+    index: int  # 0-based position of the item in the request
+    success: bool
+    status_code: int  # what the single-item endpoint would have answered: 201/200, 400, 404 or 409
+    detail: str | None = None
+    data: BorrowingRecordResponse | None = None
+
+
+class BatchResponse(BaseModel):
+    success: bool  # every item succeeded
+    succeeded: int
+    failed: int
+    results: list[BatchItemResult]
@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+
+
+class BulkImportError(BaseModel):
+    row: int  # 1-based position of the record in the payload (CSV header excluded)
+    error: str
+
+
+class BulkImportResponse(BaseModel):
+    success: bool
+    inserted: int
+    failed: int
+    errors: list[BulkImportError] = []
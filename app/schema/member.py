@@ -1,3 +1,5 @@
+from datetime import date
+
 from pydantic import BaseModel
 
 
@@ -15,12 +17,29 @@ class MemberResponse(BaseModel):
         from_attributes = True
 
 
+class BorrowingHistoryItem(BaseModel):
+    borrow_id: int
+    book_id: int
+    book_title: str | None = None
+    borrow_date: date
+    return_date: date | None = None
+
+
+class CurrentlyBorrowedBook(BaseModel):
+    borrow_id: int
+    book_title: str | None = None
+    borrow_date: date
+    days_borrowed: int
+    due_date: date
+    is_overdue: bool
+
+
 class MemberDetailResponse(BaseModel):
     id: int
     name: str
     email: str
-    borrowing_history: list[dict] = []
-    currently_borrowed_books: list[dict] = []
+    borrowing_history: list[BorrowingHistoryItem] = []
+    currently_borrowed_books: list[CurrentlyBorrowedBook] = []
 
     class Config:
         from_attributes = True
@@ -0,0 +1,34 @@
+from datetime import date
+
+from pydantic import BaseModel
+
+
+class LoanSummary(BaseModel):
+    total_loans: int
+    open_loans: int
+    overdue_loans: int  # open loans borrowed more than loan_period_days ago
+    loan_period_days: int
+
+
+class BookLoanStatsResponse(BaseModel):
+    book_id: int
+    title: str
+    author: str
+    open_loans: int
+    total_loans: int
+    last_borrowed: date | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class MemberLoanStatsResponse(BaseModel):
+    member_id: int
+    name: str
+    email: str
+    open_loans: int
+    total_loans: int
+    last_borrowed: date | None = None
+
+    class Config:
+        from_attributes = True
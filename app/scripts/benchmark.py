@@ -0,0 +1,282 @@
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+import httpx
+from sqlalchemy import func
+from sqlmodel import select
+
+from app.main import app
+from app.models.engine import SessionLocal
+from app.models.models import Book, Member
+from app.scripts.generate_data import TITLE_WORDS, zipf_weights
+from app.utils.pagination import encode_cursor
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+BASELINE_PATH = PROJECT_ROOT / "benchmarks" / "baseline.json"
+
+BENCH_USER = {"username": "benchmark", "email": "benchmark@example.org", "password": "benchmark-password"}
+BENCH_LOGIN = {"email": BENCH_USER["email"], "password": BENCH_USER["password"]}
+
+
+class Workload:
+    """Ids and credentials shared by the scenarios, hot ids are drawn with the same skew as the generated data"""
+
+    def __init__(self, client: httpx.AsyncClient, token: str, max_book_id: int, max_member_id: int, skew: float):
+        self.client = client
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.max_book_id = max_book_id
+        self.max_member_id = max_member_id
+        self.book_weights = list(itertools.accumulate(zipf_weights(max_book_id, skew)))
+        self.member_weights = list(itertools.accumulate(zipf_weights(max_member_id, skew)))
+
+    def hot_book_id(self) -> int:
+        return random.choices(range(1, self.max_book_id + 1), cum_weights=self.book_weights)[0]
+
+    def hot_member_id(self) -> int:
+        return random.choices(range(1, self.max_member_id + 1), cum_weights=self.member_weights)[0]
+
+    def page_cursor(self, max_id: int) -> str:
+        return encode_cursor(random.randint(0, max_id))
+
+    async def get(self, url: str, expected: tuple[int, ...] = (200,)) -> bool:
+        response = await self.client.get(url, headers=self.headers)
+        return response.status_code in expected
+
+
+# Scenario name -> one operation, returning False when the API answered with an unexpected status.
+# Names start with the router they exercise, --only filters on that prefix.
+async def books_list(w: Workload) -> bool:
+    return await w.get(f"/books/?cursor={w.page_cursor(w.max_book_id)}")
+
+
+async def books_list_available(w: Workload) -> bool:
+    return await w.get(f"/books/?is_available=true&cursor={w.page_cursor(w.max_book_id)}")
+
+
+async def books_detail(w: Workload) -> bool:
+    return await w.get(f"/books/{w.hot_book_id()}", expected=(200, 404))  # ids freed by deletions answer 404
+
+
+async def books_search(w: Workload) -> bool:
+    return await w.get(f"/books/search?q={random.choice(TITLE_WORDS)}+{random.choice(TITLE_WORDS)[:3]}")
+
+
+async def members_list(w: Workload) -> bool:
+    return await w.get(f"/members/?cursor={w.page_cursor(w.max_member_id)}")
+
+
+async def members_detail(w: Workload) -> bool:
+    return await w.get(f"/members/{w.hot_member_id()}", expected=(200, 404))
+
+
+async def borrowing_records_list(w: Workload) -> bool:
+    return await w.get("/borrowing_records/?limit=100")
+
+
+async def borrowing_records_overdue(w: Workload) -> bool:
+    return await w.get("/borrowing_records/overdue")
+
+
+async def borrowing_records_export(w: Workload) -> bool:
+    return await w.get(f"/borrowing_records/export?format=csv&book_id={w.hot_book_id()}")
+
+
+async def borrowing_records_checkout_return(w: Workload) -> bool:
+    # Borrows a random book and returns it, a book that is already out (409) counts as a success
+    body = {"book_id": random.randint(1, w.max_book_id), "member_id": random.randint(1, w.max_member_id)}
+    response = await w.client.post("/borrowing_records/", json=body, headers=w.headers)
+    if response.status_code in (404, 409):
+        return True
+    if response.status_code != 201:
+        return False
+    borrow_id = response.json()["data"]["borrow_id"]
+    response = await w.client.patch(
+        f"/borrowing_records/{borrow_id}", json={"return_date": date.today().isoformat()}, headers=w.headers
+    )
+    return response.status_code == 200
+
+
+async def borrowing_records_batch_checkout_return(w: Workload) -> bool:
+    # Borrows ten random books in one request and returns the ones that were checked out in another
+    items = [
+        {"book_id": random.randint(1, w.max_book_id), "member_id": random.randint(1, w.max_member_id)}
+        for _ in range(10)
+    ]
+    response = await w.client.post("/borrowing_records/batch", json={"items": items}, headers=w.headers)
+    if response.status_code != 200:
+        return False
+    created = [result["data"]["borrow_id"] for result in response.json()["results"] if result["success"]]
+    if not created:
+        return True
+    returns = {"items": [{"borrow_id": borrow_id} for borrow_id in created]}
+    response = await w.client.patch("/borrowing_records/batch", json=returns, headers=w.headers)
+    return response.status_code == 200 and response.json()["success"]
+
+
+async def stats_summary(w: Workload) -> bool:
+    return await w.get("/stats/")
+
+
+async def stats_top_books(w: Workload) -> bool:
+    return await w.get("/stats/books?limit=20")
+
+
+async def auth_login(w: Workload) -> bool:
+    response = await w.client.post("/auth/login", json=BENCH_LOGIN)
+    return response.status_code == 200
+
+
+# Scenario -> share of --requests it runs, logins are kept short since bcrypt is slow on purpose
+SCENARIOS = {
+    "books.list": (books_list, 1.0),
+    "books.list_available": (books_list_available, 1.0),
+    "books.detail": (books_detail, 1.0),
+    "books.search": (books_search, 1.0),
+    "members.list": (members_list, 1.0),
+    "members.detail": (members_detail, 1.0),
+    "borrowing_records.list": (borrowing_records_list, 1.0),
+    "borrowing_records.overdue": (borrowing_records_overdue, 1.0),
+    "borrowing_records.export": (borrowing_records_export, 0.5),
+    "borrowing_records.checkout_return": (borrowing_records_checkout_return, 0.5),
+    "borrowing_records.batch_checkout_return": (borrowing_records_batch_checkout_return, 0.1),
+    "stats.summary": (stats_summary, 1.0),
+    "stats.top_books": (stats_top_books, 1.0),
+    "auth.login": (auth_login, 0.05),
+}
+
+
+async def run_scenario(workload: Workload, operation, requests: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:  # the iterator is shared, so the workers split the requests between them
+            started = time.perf_counter()
+            ok = await operation(workload)
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentiles[49] * 1000, 2),
+        "p90_ms": round(percentiles[89] * 1000, 2),
+        "p99_ms": round(percentiles[98] * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+    }
+
+
+async def login(client: httpx.AsyncClient) -> str:
+    await client.post("/auth/register", json=BENCH_USER)  # 400 when it already exists
+    response = await client.post("/auth/login", json=BENCH_LOGIN)
+    response.raise_for_status()
+    return response.json()["token"]
+
+
+async def benchmark(names: list[str], requests: int, concurrency: int, skew: float, seed: int) -> dict:
+    random.seed(seed)
+    async with SessionLocal() as db:
+        max_book_id = (await db.exec(select(func.max(Book.id)))).one() or 0
+        max_member_id = (await db.exec(select(func.max(Member.id)))).one() or 0
+    if not max_book_id or not max_member_id:
+        sys.exit("❌ The database has no books or members, run the seeder or app.scripts.generate_data first")
+
+    results = {}
+    # The app runs in this process, requests go through the full ASGI stack (middleware, dependencies,
+    # serialization) without sockets, so the numbers measure the API and not the network.
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            workload = Workload(client, await login(client), max_book_id, max_member_id, skew)
+            for name in names:
+                operation, share = SCENARIOS[name]
+                count = max(2, int(requests * share))
+                await run_scenario(workload, operation, max(1, count // 10), concurrency)  # warm-up
+                results[name] = await run_scenario(workload, operation, count, concurrency)
+                print_result(name, results[name])
+
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "dataset": {"books": max_book_id, "members": max_member_id},
+        "concurrency": concurrency,
+        "scenarios": results,
+    }
+
+
+def print_result(name: str, result: dict):
+    print(
+        f"{name:<36} {result['throughput_rps']:>9.1f} req/s  p50 {result['p50_ms']:>8.2f} ms"
+        f"  p90 {result['p90_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  errors {result['errors']}"
+    )
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """List the scenarios that got slower than the baseline by more than the tolerance"""
+    regressions = []
+    for name, result in report["scenarios"].items():
+        if result["errors"]:
+            regressions.append(f"{name}: {result['errors']} unexpected responses")
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            if result[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {previous[metric]} -> {result[metric]}")
+        if result["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {result['throughput_rps']} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every router in-process against DATABASE_URL")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at the same time")
+    parser.add_argument("--only", nargs="*", default=[], help="Scenario name prefixes, e.g. books members.detail")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of the book and member ids requested")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", type=Path, nargs="?", const=BASELINE_PATH, help="Store the results as baseline")
+    parser.add_argument("--compare", type=Path, nargs="?", const=BASELINE_PATH, help="Fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before failing --compare")
+    args = parser.parse_args()
+
+    if args.compare and not args.compare.is_file():
+        sys.exit(f"❌ No baseline at {args.compare}, record one first with `make bench-baseline`")
+
+    names = [name for name in SCENARIOS if not args.only or any(name.startswith(p) for p in args.only)]
+    report = asyncio.run(benchmark(names, args.requests, args.concurrency, args.skew, args.seed))
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\n💾 Baseline saved to {args.save}")
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"❌ {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"\n✅ No regression against {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from app.core.settings import settings
+from app.main import app
+from app.utils.openapi import export_openapi_schema
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the OpenAPI schema, workers load it instead of building it")
+    parser.add_argument("--output", type=Path, default=Path(settings.OPENAPI_SCHEMA_PATH))
+    parser.add_argument("--check", action="store_true", help="Fail if the exported schema is missing or out of date")
+    args = parser.parse_args()
+
+    schema = json.dumps(export_openapi_schema(app), indent=2) + "\n"
+
+    if args.check:
+        if not args.output.is_file() or args.output.read_text() != schema:
+            sys.exit(f"❌ {args.output} is out of date, run python -m app.scripts.export_openapi")
+        print(f"✅ {args.output} is up to date")
+        return
+
+    args.output.write_text(schema)
+    print(f"💾 OpenAPI schema written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
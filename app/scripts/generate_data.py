@@ -0,0 +1,195 @@
+import argparse
+import itertools
+import random
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert, select
+
+from app.core.settings import settings
+from app.models.engine import build_engine
+from app.models.models import Book, BorrowingRecords, Member
+from app.services.http_cache import bump_statement
+from app.services.loan_stats import rebuild_statements
+
+# Word pools the synthetic titles, authors and member names are drawn from
+TITLE_WORDS = [
+    "Shadow", "River", "Empire", "Garden", "Silent", "Winter", "Glass", "Iron", "Last", "Hidden",
+    "Golden", "Night", "City", "Ocean", "Stone", "Fire", "Memory", "Storm", "Paper", "Wild",
+    "Secret", "Northern", "Broken", "Distant", "Crimson", "House", "Road", "Island", "Light", "Song",
+]
+FIRST_NAMES = [
+    "Alice", "Bob", "Charlie", "Diana", "Ethan", "Fiona", "George", "Hannah", "Ines", "Jamal",
+    "Kenji", "Laura", "Mateo", "Nadia", "Omar", "Priya", "Quentin", "Rosa", "Samir", "Tara",
+]
+LAST_NAMES = [
+    "Johnson", "Smith", "Brown", "Prince", "Hunt", "Green", "Wilson", "Lee", "Garcia", "Nguyen",
+    "Martin", "Rossi", "Tanaka", "Okafor", "Dubois", "Kowalski", "Silva", "Novak", "Haddad", "Berg",
+]
+
+HISTORY_DAYS = 5 * 365  # Loans are spread over the last five years
+MAX_LOANS_PER_BOOK = HISTORY_DAYS // 35  # Back-to-back loans take ~30 days on average, this is what fits the window
+OPEN_LOAN_RATE = 0.15  # Share of borrowed books whose latest loan is still open
+
+
+def zipf_weights(count: int, skew: float) -> list[float]:
+    # Weight of the item ranked r is 1 / r^skew: a few very popular items and a long tail.
+    # Ranks are shuffled so popular items are spread over the id range instead of being the first rows.
+    weights = [1 / rank**skew for rank in range(1, count + 1)]
+    random.shuffle(weights)
+    return weights
+
+
+def next_id(connection, model) -> int:
+    # Rows get explicit ids following the existing ones, so loans can reference them without reading them back
+    return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def sync_id_sequences(connection, *models):
+    # Postgres sequences do not see explicit ids, move them past the largest one or the next row
+    # created through the API would reuse an id. SQLite always continues from the largest rowid.
+    if connection.dialect.name != "postgresql":
+        return
+    for model in models:
+        sequence = func.pg_get_serial_sequence(model.__tablename__, "id")
+        connection.execute(select(func.setval(sequence, func.coalesce(func.max(model.id), 1))))
+
+
+def book_rows(first_id: int, count: int, author_count: int, skew: float):
+    authors = [f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)} {n}" for n in range(author_count)]
+    cum_weights = list(itertools.accumulate(zipf_weights(author_count, skew)))  # a few prolific authors
+    for book_id in range(first_id, first_id + count):
+        yield {
+            "id": book_id,
+            "title": " ".join(random.sample(TITLE_WORDS, random.randint(1, 4))),
+            "author": random.choices(authors, cum_weights=cum_weights)[0],
+            "published_year": max(1450, date.today().year - int(random.expovariate(1 / 25))),  # mostly recent
+            "isbn": f"979-9-{book_id:09d}",  # 979-9 is not assigned, no clash with real ISBNs
+        }
+
+
+def member_rows(first_id: int, count: int):
+    for member_id in range(first_id, first_id + count):
+        yield {
+            "id": member_id,
+            "name": f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}",
+            "email": f"member{member_id}@example.org",
+        }
+
+
+def loan_counts(weights: list[float], loan_count: int) -> list[float]:
+    # Expected loans per book, proportional to its weight but capped at MAX_LOANS_PER_BOOK.
+    # Going from the most popular book down, what a capped book cannot take is shared by the next ones.
+    counts = [0.0] * len(weights)
+    remaining_loans, remaining_weight = float(loan_count), sum(weights)
+    for index in sorted(range(len(weights)), key=weights.__getitem__, reverse=True):
+        counts[index] = min(MAX_LOANS_PER_BOOK, weights[index] * remaining_loans / remaining_weight)
+        remaining_loans -= counts[index]
+        remaining_weight -= weights[index]
+    return counts
+
+
+def loan_rows(book_ids: range, member_ids: range, loan_count: int, skew: float, member_skew: float):
+    # Each book gets its share of loan_count and its loans are laid out back to back going back from today,
+    # so a book never has two overlapping (or two open) loans.
+    book_counts = loan_counts(zipf_weights(len(book_ids), skew), loan_count)
+    member_cum_weights = list(itertools.accumulate(zipf_weights(len(member_ids), member_skew)))  # heavy readers
+    today = date.today()
+    oldest = today - timedelta(days=HISTORY_DAYS)
+
+    for book_id, expected in zip(book_ids, book_counts):
+        count = int(expected) + (random.random() < expected % 1)  # stochastic rounding keeps the total
+        end = today
+        for n in range(count):
+            borrow_date = end - timedelta(days=random.randint(3, 28))
+            if borrow_date < oldest:
+                break
+            is_open = n == 0 and random.random() < OPEN_LOAN_RATE
+            yield {
+                "book_id": book_id,
+                "member_id": random.choices(member_ids, cum_weights=member_cum_weights)[0],
+                "borrow_date": borrow_date,
+                "return_date": None if is_open else min(end, borrow_date + timedelta(days=random.randint(1, 21))),
+            }
+            end = borrow_date - timedelta(days=random.randint(0, 30))
+
+
+def insert_batches(connection, model, rows, batch_size: int) -> int:
+    # executemany per batch, each batch in its own transaction so memory stays flat for millions of rows
+    inserted = 0
+    while batch := list(itertools.islice(rows, batch_size)):
+        with connection.begin():
+            connection.execute(insert(model), batch)
+        inserted += len(batch)
+        print(f"   {model.__tablename__}: {inserted:,}", end="\r")
+    print()
+    return inserted
+
+
+def generate(
+    books: int,
+    members: int,
+    loans: int,
+    authors: int,
+    skew: float,
+    member_skew: float,
+    batch_size: int,
+    seed: int | None,
+):
+    """Append a synthetic dataset to the configured database"""
+    random.seed(seed)
+    engine = build_engine(settings.DATABASE_URL)
+    started = time.perf_counter()
+    print(f"🌱 Generating {books:,} books, {members:,} members and ~{loans:,} loans (skew {skew})...\n")
+
+    with engine.connect() as connection:
+        first_book_id = next_id(connection, Book)
+        first_member_id = next_id(connection, Member)
+        connection.rollback()  # end the implicit transaction opened by the reads above
+
+        insert_batches(connection, Book, book_rows(first_book_id, books, authors, skew), batch_size)
+        insert_batches(connection, Member, member_rows(first_member_id, members), batch_size)
+        inserted_loans = insert_batches(
+            connection,
+            BorrowingRecords,
+            loan_rows(
+                range(first_book_id, first_book_id + books),
+                range(first_member_id, first_member_id + members),
+                loans,
+                skew,
+                member_skew,
+            ),
+            batch_size,
+        )
+
+        # Invalidate ETags / cached responses built from the previous content of these tables
+        # and recount the loan statistics, the loans were inserted without going through the API
+        with connection.begin():
+            sync_id_sequences(connection, Book, Member)
+            for statement in rebuild_statements():
+                connection.execute(statement)
+            connection.execute(bump_statement("book", "member", "borrowingrecords"))
+
+    print(f"\n✅ Generated {books:,} books, {members:,} members, {inserted_loans:,} loans")
+    print(f"⏱️  {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append a large synthetic dataset to the database in DATABASE_URL")
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--members", type=int, default=20_000)
+    parser.add_argument("--loans", type=int, default=500_000, help="Target number of loans")
+    parser.add_argument("--authors", type=int, default=5_000)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of book and author popularity")
+    parser.add_argument("--member-skew", type=float, default=0.5, help="Zipf exponent of member activity")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="Rows inserted per transaction")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed, the same seed gives the same dataset")
+    args = parser.parse_args()
+
+    generate(
+        args.books, args.members, args.loans, args.authors, args.skew, args.member_skew, args.batch_size, args.seed
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,36 @@
+import argparse
+import asyncio
 from datetime import date, timedelta
 
 # Database connection
 from pathlib import Path
 
-from sqlmodel import Session, create_engine, select
+from sqlmodel import Session, select
 
+from app.core.settings import settings
+from app.models.engine import SessionLocal, build_engine
 from app.models.models import Book, BorrowingRecords, Member
+from app.schema.book import BookRequest
+from app.schema.member import MemberRequest
+from app.services.bulk_import import import_records, parse_records
+from app.services.http_cache import bump_statement
+from app.services.loan_stats import rebuild_loan_stats, rebuild_statements
 
-# Get the project root directory (parent of app folder)
-PROJECT_ROOT = Path(__file__).parent.parent.parent
-DATABASE_PATH = PROJECT_ROOT / "database.db"
-DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+# The same database as the API, import and rebuild-stats (DATABASE_URL)
+engine = build_engine(settings.DATABASE_URL)
 
-engine = create_engine(DATABASE_URL, echo=True)
+# File suffix -> content type understood by parse_records
+IMPORT_CONTENT_TYPES = {
+    ".csv": "text/csv",
+    ".ndjson": "application/x-ndjson",
+    ".jsonl": "application/x-ndjson",
+    ".json": "application/json",
+}
+# import target -> (model, row schema, unique column)
+IMPORT_TARGETS = {
+    "books": (Book, BookRequest, "isbn"),
+    "members": (Member, MemberRequest, "email"),
+}
 
 
 def create_tables():
@@ -51,11 +69,8 @@ def seed_books(session: Session):
         {"title": "The Alchemist", "author": "Paulo Coelho", "published_year": 1988, "isbn": "978-0-06-112241-5"},
     ]
 
-    books = []
-    for book_data in books_data:
-        book = Book(**book_data)
-        session.add(book)
-        books.append(book)
+    books = [Book(**book_data) for book_data in books_data]
+    session.add_all(books)
 
     session.commit()
     print(f"✅ Seeded {len(books)} books")
@@ -75,11 +90,8 @@ def seed_members(session: Session):
         {"name": "Hannah Lee", "email": "hannah.lee@email.com"},
     ]
 
-    members = []
-    for member_data in members_data:
-        member = Member(**member_data)
-        session.add(member)
-        members.append(member)
+    members = [Member(**member_data) for member_data in members_data]
+    session.add_all(members)
 
     session.commit()
     print(f"✅ Seeded {len(members)} members")
@@ -175,19 +187,16 @@ def seed_borrowing_records(session: Session, books: list[Book], members: list[Me
         },
     ]
 
-    records = []
-    for record_data in borrowing_data:
-        record = BorrowingRecords(**record_data)
-        session.add(record)
-        records.append(record)
+    records = [BorrowingRecords(**record_data) for record_data in borrowing_data]
+    session.add_all(records)
 
     session.commit()
     print(f"✅ Seeded {len(records)} borrowing records")
     return records
 
 
-def main():
-    """Main seeder function"""
+def seed():
+    """Seed the sample dataset"""
     print("🌱 Starting database seeding...\n")
 
     # Note: Make sure you've run Alembic migrations first!
@@ -207,9 +216,65 @@ def main():
         members = seed_members(session)
         borrowing_records = seed_borrowing_records(session, books, members)
 
+        # The records were inserted directly, the loan counters are computed from them, and running workers
+        # must stop answering 304 / serving cached pages built from the previous content of these tables
+        for statement in rebuild_statements():
+            session.execute(statement)
+        session.execute(bump_statement("book", "member", "borrowingrecords"))
+        session.commit()
+
         print("\n✨ Database seeding completed successfully!")
         print(f"📚 Total: {len(books)} books, {len(members)} members, {len(borrowing_records)} borrowing records")
 
 
+async def read_file(path: Path, chunk_size: int = 64 * 1024):
+    """Read a file as a stream of byte chunks, like a request body"""
+    with path.open("rb") as file:
+        while chunk := file.read(chunk_size):
+            yield chunk
+
+
+async def import_file(target: str, path: Path):
+    """Bulk import books or members from a JSON, NDJSON or CSV file"""
+    model, schema, unique_field = IMPORT_TARGETS[target]
+    content_type = IMPORT_CONTENT_TYPES.get(path.suffix.lower(), "application/json")
+
+    print(f"📥 Importing {target} from {path} ({content_type})...\n")
+    async with SessionLocal() as session:
+        records = parse_records(read_file(path), content_type)
+        report = await import_records(session, model, schema, records, unique_field=unique_field)
+
+    for error in report["errors"]:
+        print(f"❌ Row {error['row']}: {error['error']}")
+    print(f"\n✅ Imported {report['inserted']} {target}, {report['failed']} failed")
+
+
+async def rebuild_stats():
+    """Recompute the loan counters behind /stats from the borrowing records"""
+    print("🔄 Rebuilding loan statistics...\n")
+    async with SessionLocal() as session:
+        await rebuild_loan_stats(session)
+    print("✅ Loan statistics rebuilt")
+
+
+def main():
+    """Main seeder function"""
+    parser = argparse.ArgumentParser(description="Seed or bulk import library data")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("seed", help="Seed the sample dataset (default)")
+    import_parser = subparsers.add_parser("import", help="Bulk import books or members from a file")
+    import_parser.add_argument("target", choices=IMPORT_TARGETS)
+    import_parser.add_argument("path", type=Path, help="JSON array, NDJSON (.ndjson/.jsonl) or CSV file")
+    subparsers.add_parser("rebuild-stats", help="Recompute the loan counters from the borrowing records")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        asyncio.run(import_file(args.target, args.path))
+    elif args.command == "rebuild-stats":
+        asyncio.run(rebuild_stats())
+    else:
+        seed()
+
+
 if __name__ == "__main__":
     main()
@@ -1,19 +1,96 @@
-from fastapi import Depends, HTTPException
+import math
+import time
+
+from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
-from sqlmodel import Session
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.models.engine import get_db
+from app.core.settings import settings
+from app.models.engine import get_write_db
 from app.models.models import User
-from app.utils.auth import validate_token
+from app.schema.auth import CurrentUser
+from app.utils.admission import RateLimiter
+from app.utils.auth import decode_token
+from app.utils.cache import TTLCache
 
 security = HTTPBearer()
 
+# token -> decoded claims. An entry never outlives the token's own "exp",
+# so a cache hit skips the signature check without ever accepting an expired token.
+_token_cache = TTLCache(maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+# user id -> CurrentUser, shared by all tokens of the same user.
+_user_cache = TTLCache(maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+# user id -> token bucket, per worker: the effective limit is the rate times the number of workers
+_rate_limiter = RateLimiter(
+    rate=settings.USER_RATE_LIMIT_PER_SECOND, burst=settings.USER_RATE_LIMIT_BURST, maxsize=settings.AUTH_CACHE_SIZE
+)
+
+
+def invalidate_user(user_id: int):
+    # Only this worker's cache is cleared, other workers pick up the change within AUTH_CACHE_TTL_SECONDS.
+    _user_cache.pop(user_id)
+
+
+# Changed users are noted at flush and only invalidated once committed: invalidated at flush, a concurrent
+# request could cache the old row again before the commit, or a rollback would leave nothing to invalidate.
+_CHANGED_USERS = "changed_user_ids"
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _note_changed_user(mapper, connection, target: User):
+    object_session(target).info.setdefault(_CHANGED_USERS, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session):
+    for user_id in session.info.pop(_CHANGED_USERS, ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Session):
+    session.info.pop(_CHANGED_USERS, None)
+
+
+def _verified_claims(token: str) -> dict:
+    claims = _token_cache.get(token)
+    if claims is None:
+        claims = decode_token(token)
+        if not claims or claims.get("id") is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+
+        ttl = min(settings.AUTH_CACHE_TTL_SECONDS, claims["exp"] - time.time())
+        _token_cache.set(token, claims, ttl=ttl)
+    return claims
+
+
+# Users are read from the primary: a replica may not have an account registered a moment ago
+async def get_current_user(token=Depends(security), db: AsyncSession = Depends(get_write_db)) -> CurrentUser:
+    claims = _verified_claims(token.credentials)
+    user_id = claims["id"]
+
+    # Rate limited as soon as the caller is identified, before any database work
+    if settings.USER_RATE_LIMIT_PER_SECOND > 0 and (wait := _rate_limiter.acquire(user_id)):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, slow down",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+
+    # The token is signed by us, so its claims can stand in for the user row when allowed.
+    if settings.AUTH_TRUST_TOKEN_CLAIMS and "username" in claims and "email" in claims:
+        return CurrentUser(id=user_id, username=claims["username"], email=claims["email"])
 
-def get_current_user(token=Depends(security), db: Session = Depends(get_db)):
-    user_id = validate_token(token.credentials)
+    user = _user_cache.get(user_id)
+    if user is None:
+        db_user = await db.get(User, user_id)
+        if not db_user:
+            raise HTTPException(status_code=404, detail="user not found")
 
-    user = db.get(User, user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="user not found")
+        user = CurrentUser.model_validate(db_user)
+        _user_cache.set(user_id, user)
 
     return user
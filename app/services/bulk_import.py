@@ -0,0 +1,161 @@
+import csv
+import json
+from collections.abc import AsyncIterator
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.settings import settings
+from app.services.http_cache import bump_table_versions
+
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines"}
+CSV_TYPES = {"text/csv", "application/csv"}
+
+
+def _decode(line: bytes, encoding: str = "utf-8") -> tuple[str | None, str | None]:
+    try:
+        return line.decode(encoding).rstrip("\r"), None
+    except UnicodeDecodeError as e:
+        return None, f"Invalid UTF-8: {e}"
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[str | None, str | None]]:
+    # Splits the byte stream on "\n" as it arrives, so only one partial line is ever buffered.
+    # Yields (line, None), or (None, error) for a line that is not UTF-8 (e.g. a Latin-1 export),
+    # which is then reported as a failed row like any other malformed line.
+    # The first line is read as utf-8-sig: Excel starts its UTF-8 CSV exports with a BOM, which would
+    # otherwise stick to the first column name.
+    encoding = "utf-8-sig"
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield _decode(line, encoding)
+            encoding = "utf-8"
+    if buffer:
+        yield _decode(buffer, encoding)
+
+
+async def parse_records(
+    chunks: AsyncIterator[bytes], content_type: str
+) -> AsyncIterator[tuple[dict | None, str | None]]:
+    # Yields (record, None) for every parsed row, or (None, error) when a row cannot be parsed,
+    # so one malformed line is reported without aborting the whole import.
+    media_type = content_type.split(";")[0].strip().lower()
+
+    if media_type in NDJSON_TYPES:
+        async for line, error in _iter_lines(chunks):
+            if error is not None:
+                yield None, error
+                continue
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line), None
+            except json.JSONDecodeError as e:
+                yield None, f"Invalid JSON: {e}"
+
+    elif media_type in CSV_TYPES:
+        # Rows are parsed line by line, quoted fields spanning several lines are not supported.
+        fieldnames = None
+        async for line, error in _iter_lines(chunks):
+            if error is not None:
+                if fieldnames is None:
+                    # Without its header no row can be read
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"CSV header: {error}")
+                yield None, error
+                continue
+            if not line.strip():
+                continue
+            values = next(csv.reader([line]))
+            if fieldnames is None:
+                fieldnames = [name.strip() for name in values]
+            elif len(values) != len(fieldnames):
+                yield None, f"Expected {len(fieldnames)} columns, got {len(values)}"
+            else:
+                yield dict(zip(fieldnames, values)), None
+
+    else:
+        # A JSON array cannot be split before it is fully received, it is parsed in one go
+        # and only the NDJSON/CSV formats stream in constant memory.
+        body = b"".join([chunk async for chunk in chunks])
+        try:
+            records = json.loads(body or b"[]")
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid JSON: {e}")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a JSON array")
+        for record in records:
+            yield record, None
+
+
+async def import_records(
+    db: AsyncSession,
+    model: type[SQLModel],
+    schema: type[BaseModel],
+    records: AsyncIterator[tuple[dict | None, str | None]],
+    unique_field: str,
+) -> dict:
+    report = {"success": True, "inserted": 0, "failed": 0, "errors": []}
+
+    def fail(row: int, error: str):
+        report["failed"] += 1
+        if len(report["errors"]) < settings.BULK_IMPORT_MAX_ERRORS:
+            report["errors"].append({"row": row, "error": error})
+
+    async def flush(chunk: list[tuple[int, dict]]):
+        # Rows whose unique value is already stored are reported instead of failing the whole chunk.
+        unique_column = getattr(model, unique_field)
+        values = [data[unique_field] for _, data in chunk]
+        existing = set((await db.exec(select(unique_column).where(unique_column.in_(values)))).all())
+
+        to_insert = []
+        for row, data in chunk:
+            if data[unique_field] in existing:
+                fail(row, f"Duplicate {unique_field}: {data[unique_field]}")
+                continue
+            existing.add(data[unique_field])  # also catches duplicates inside the chunk
+            to_insert.append((row, data))
+
+        if not to_insert:
+            return
+
+        # One executemany INSERT and one transaction per chunk, instead of a commit per row.
+        try:
+            await db.exec(insert(model), params=[data for _, data in to_insert])
+            await bump_table_versions(db, model.__tablename__)
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            for row, _ in to_insert:
+                fail(row, f"Chunk rolled back: {e.orig}")
+            return
+        report["inserted"] += len(to_insert)
+
+    chunk = []
+    row = 0
+    async for data, error in records:
+        row += 1
+        if error is not None:
+            fail(row, error)
+            continue
+        try:
+            chunk.append((row, schema.model_validate(data).model_dump()))
+        except ValidationError as e:
+            fail(row, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+            continue
+
+        if len(chunk) >= settings.BULK_IMPORT_CHUNK_SIZE:
+            await flush(chunk)
+            chunk = []
+
+    if chunk:
+        await flush(chunk)
+
+    report["success"] = report["failed"] == 0
+    return report
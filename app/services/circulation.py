@@ -0,0 +1,164 @@
+from collections import defaultdict
+from datetime import date, timedelta
+
+from fastapi import status
+from sqlalchemy import case, insert, literal, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.settings import settings
+from app.models.models import Book, BorrowingRecords, Member, book_is_available
+from app.schema.borrowing_record import BorrowingRecordRequest, BorrowingRecordResponse, ReturnRequest
+from app.services.http_cache import bump_table_versions
+from app.services.loan_stats import record_checkouts, record_returns
+
+RECORD_COLUMNS = (
+    BorrowingRecords.borrow_id,
+    BorrowingRecords.book_id,
+    BorrowingRecords.member_id,
+    BorrowingRecords.borrow_date,
+    BorrowingRecords.return_date,
+    BorrowingRecords.is_overdue,
+)
+
+
+def _result(index: int, status_code: int, detail: str | None = None, record=None) -> dict:
+    return {
+        "index": index,
+        "success": status_code < 400,
+        "status_code": status_code,
+        "detail": detail,
+        "data": BorrowingRecordResponse.model_validate(record) if record is not None else None,
+    }
+
+
+def _unique(items: list, key: str, detail: str, results: dict[int, dict]) -> dict[int, object]:
+    # Keeps the first item per key, later duplicates fail: the same book cannot be borrowed
+    # (or the same loan returned) twice in one batch.
+    seen, kept = set(), {}
+    for index, item in enumerate(items):
+        if getattr(item, key) in seen:
+            results[index] = _result(index, status.HTTP_409_CONFLICT, detail)
+        else:
+            seen.add(getattr(item, key))
+            kept[index] = item
+    return kept
+
+
+async def checkout_batch(db: AsyncSession, items: list[BorrowingRecordRequest]) -> list[dict]:
+    """Borrow several books in one transaction, with one INSERT ... SELECT for the whole batch"""
+    results: dict[int, dict] = {}
+    requested = _unique(items, "book_id", "Book appears more than once in this batch", results)
+
+    # Only the (book, member) pairs of the batch whose book exists and is available and whose member exists
+    # are selected, the id IN lists keep both sides on their primary key.
+    pairs = [(item.book_id, item.member_id) for item in requested.values()]
+    checkout = (
+        insert(BorrowingRecords)
+        .from_select(
+            ["book_id", "member_id", "borrow_date"],
+            select(Book.id, Member.id, literal(date.today()))
+            .join(Member, tuple_(Book.id, Member.id).in_(pairs))
+            .where(
+                Book.id.in_([book_id for book_id, _ in pairs]),
+                Member.id.in_({member_id for _, member_id in pairs}),
+                book_is_available(),
+            ),
+        )
+        .returning(*RECORD_COLUMNS)
+    )
+    for attempt in range(2):
+        try:
+            created = {record.book_id: record for record in (await db.exec(checkout)).all()}
+            await record_checkouts(db, [(r.book_id, r.member_id, r.borrow_date) for r in created.values()])
+            if created:
+                await bump_table_versions(db, "borrowingrecords")
+            await db.commit()
+            break
+        except IntegrityError:
+            # A concurrent checkout of one of the books passed the availability check at the same time
+            # (possible outside SQLite). The batch is rolled back and run again once, that book now fails.
+            await db.rollback()
+            if attempt:
+                conflict = "Book was borrowed concurrently, retry"
+                return [_result(index, status.HTTP_409_CONFLICT, conflict) for index in range(len(items))]
+
+    # Find out why the other items were not inserted, one query per table for all of them
+    failed = [item for item in requested.values() if item.book_id not in created]
+    books, members = set(), set()
+    if failed:
+        books = set((await db.exec(select(Book.id).where(Book.id.in_([i.book_id for i in failed])))).all())
+        members = set((await db.exec(select(Member.id).where(Member.id.in_({i.member_id for i in failed})))).all())
+    for index, item in requested.items():
+        if item.book_id in created:
+            results[index] = _result(index, status.HTTP_201_CREATED, record=created[item.book_id])
+        elif item.book_id not in books:
+            results[index] = _result(index, status.HTTP_404_NOT_FOUND, "Book not found")
+        elif item.member_id not in members:
+            results[index] = _result(index, status.HTTP_404_NOT_FOUND, "Member not found")
+        else:
+            results[index] = _result(index, status.HTTP_409_CONFLICT, "Book is currently borrowed")
+    return [results[index] for index in range(len(items))]
+
+
+async def return_batch(db: AsyncSession, items: list[ReturnRequest]) -> list[dict]:
+    """Return several loans in one transaction, with one UPDATE per distinct return date"""
+    results: dict[int, dict] = {}
+    requested = _unique(items, "borrow_id", "Loan appears more than once in this batch", results)
+
+    by_date: dict[date, list[int]] = defaultdict(list)
+    for item in requested.values():
+        by_date[item.return_date].append(item.borrow_id)
+
+    # Like the single return, only open loans borrowed on or before the return date are updated,
+    # so a loan returned concurrently is not counted twice.
+    returned = {}
+    for return_date, borrow_ids in by_date.items():
+        late = BorrowingRecords.borrow_date < return_date - timedelta(days=settings.LOAN_PERIOD_DAYS)
+        statement = (
+            update(BorrowingRecords)
+            .where(
+                BorrowingRecords.borrow_id.in_(borrow_ids),
+                BorrowingRecords.return_date.is_(None),
+                BorrowingRecords.borrow_date <= return_date,
+            )
+            .values(return_date=return_date, is_overdue=case((late, True), else_=BorrowingRecords.is_overdue))
+            .returning(*RECORD_COLUMNS)
+        )
+        returned.update((record.borrow_id, record) for record in (await db.exec(statement)).all())
+
+    await record_returns(db, [(record.book_id, record.member_id) for record in returned.values()])
+    if returned:
+        await bump_table_versions(db, "borrowingrecords")
+    await db.commit()
+
+    failed = [item.borrow_id for item in requested.values() if item.borrow_id not in returned]
+    existing = {}
+    if failed:
+        # Why the other loans were not returned, one query for all of them
+        query = select(BorrowingRecords.borrow_id, BorrowingRecords.return_date).where(
+            BorrowingRecords.borrow_id.in_(failed)
+        )
+        existing = {record.borrow_id: record for record in (await db.exec(query)).all()}
+    for index, item in requested.items():
+        if item.borrow_id in returned:
+            results[index] = _result(index, status.HTTP_200_OK, record=returned[item.borrow_id])
+        elif item.borrow_id not in existing:
+            results[index] = _result(index, status.HTTP_404_NOT_FOUND, "Borrowing record not found")
+        elif existing[item.borrow_id].return_date is not None:
+            results[index] = _result(index, status.HTTP_400_BAD_REQUEST, "Book has already been returned")
+        else:
+            detail = "Return date cannot be before borrow date"
+            results[index] = _result(index, status.HTTP_400_BAD_REQUEST, detail)
+    return [results[index] for index in range(len(items))]
+
+
+def batch_response(results: list[dict]) -> dict:
+    succeeded = sum(result["success"] for result in results)
+    return {
+        "success": succeeded == len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results,
+    }
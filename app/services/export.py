@@ -0,0 +1,41 @@
+import csv
+import io
+from collections.abc import AsyncIterator
+
+from pydantic_core import to_json
+from sqlalchemy import Select
+
+from app.core.settings import settings
+from app.models.engine import read_router
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _drain(buffer: io.StringIO) -> bytes:
+    data = buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+async def stream_rows(query: Select, fmt: str) -> AsyncIterator[bytes]:
+    # The export opens its own session: it outlives the request handler and must not hold
+    # the request's session while the client slowly downloads years of history. Reports can lag
+    # a little behind the primary, they are read from a replica when there is one.
+    async with read_router.session() as db:
+        # yield_per makes the driver use a server-side cursor and fetch EXPORT_BATCH_SIZE rows at a time,
+        # rows are plain tuples (no ORM instances) serialized as soon as a batch arrives.
+        result = await db.stream(query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(result.keys())
+            async for batch in result.partitions():
+                writer.writerows(batch)
+                yield _drain(buffer)
+            if buffer.tell():
+                yield _drain(buffer)  # header only, nothing matched
+        else:
+            async for batch in result.partitions():
+                yield b"".join(to_json(row._asdict()) + b"\n" for row in batch)
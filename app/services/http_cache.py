@@ -0,0 +1,81 @@
+import hashlib
+from datetime import date, datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlmodel import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.settings import settings
+from app.models.engine import get_read_db
+from app.models.models import TableVersion
+
+
+def bump_statement(*tables: str):
+    """Statement bumping the versions of `tables`, for the sync (CLI) and async engines"""
+    # updated_at keeps its microseconds, see _not_modified_since()
+    return (
+        update(TableVersion)
+        .where(TableVersion.name.in_(tables))
+        .values(version=TableVersion.version + 1, updated_at=datetime.utcnow())
+    )
+
+
+async def bump_table_versions(db: AsyncSession, *tables: str):
+    # Must run inside the write's transaction (before its commit), so the new version becomes
+    # visible to readers, in every worker, exactly when the data it describes does.
+    await db.exec(bump_statement(*tables))
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison (RFC 9110 13.1.2): "W/" prefixes are ignored
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    # Dates in headers have whole seconds, last_modified does not: a client sending back the Last-Modified
+    # of its copy gets the full response again after a write in that same second (an extra 200, never a stale 304)
+    return since.replace(tzinfo=None) >= last_modified
+
+
+def conditional_get(*tables: str, daily: bool = False):
+    # Dependency for read endpoints whose response only depends on `tables` and the request URL
+    # (and on the current date when `daily` is set, e.g. for "days borrowed" counters).
+    # It costs one primary-key lookup: an unchanged resource is answered with 304 Not Modified
+    # before the endpoint queries or serializes anything.
+    async def check(request: Request, response: Response, db: AsyncSession = Depends(get_read_db)) -> str:
+        versions = (await db.exec(select(TableVersion).where(TableVersion.name.in_(tables)))).all()
+        fingerprint = ",".join(f"{row.name}:{row.version}" for row in sorted(versions, key=lambda row: row.name))
+        if daily:
+            fingerprint += f"|{date.today().isoformat()}"
+        digest = hashlib.sha1(f"{request.url.path}?{request.url.query}|{fingerprint}".encode()).hexdigest()
+        etag = f'W/"{digest[:20]}"'
+        last_modified = max((row.updated_at for row in versions), default=datetime(1970, 1, 1))
+
+        headers = {
+            "ETag": etag,
+            "Last-Modified": format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True),
+            "Cache-Control": settings.HTTP_CACHE_CONTROL,
+        }
+
+        # If-None-Match takes precedence, If-Modified-Since is only used without it (RFC 9110 13.2.2)
+        if_none_match = request.headers.get("if-none-match")
+        if_modified_since = request.headers.get("if-modified-since")
+        if (if_none_match is not None and _etag_matches(if_none_match, etag)) or (
+            if_none_match is None
+            and if_modified_since is not None
+            and _not_modified_since(if_modified_since, last_modified)
+        ):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response.headers.update(headers)
+        return etag
+
+    return check
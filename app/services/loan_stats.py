@@ -0,0 +1,122 @@
+from datetime import date, timedelta
+
+from sqlalchemy import case, delete, func, literal
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.settings import settings
+from app.models.models import BookLoanStats, BorrowingRecords, LoanCounter, MemberLoanStats
+from app.services.http_cache import bump_table_versions
+
+# Upserts are dialect specific in SQLAlchemy, both dialects support ON CONFLICT ... DO UPDATE
+_UPSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def overdue_before() -> date:
+    # Open loans borrowed before this date are overdue
+    return date.today() - timedelta(days=settings.LOAN_PERIOD_DAYS)
+
+
+async def _upsert(db: AsyncSession, model, key: str, rows: list[dict]):
+    # Creates the counters row on a first loan, otherwise adds the deltas to it in place (no read),
+    # one executemany for all rows. last_borrowed is None for returns, which leaves it unchanged.
+    upsert = _UPSERTS[db.get_bind().dialect.name](model)
+    newer = upsert.excluded.last_borrowed
+    latest = case((newer > model.last_borrowed, newer), else_=model.last_borrowed)  # the stored date if newer is NULL
+    await db.exec(
+        upsert.on_conflict_do_update(
+            index_elements=[key],
+            set_={
+                "open_loans": model.open_loans + upsert.excluded.open_loans,
+                "total_loans": model.total_loans + upsert.excluded.total_loans,
+                "last_borrowed": func.coalesce(latest, newer),
+            },
+        ),
+        params=rows,
+    )
+
+
+async def _bump_counters(db: AsyncSession, **deltas: int):
+    for name, delta in deltas.items():
+        if delta:
+            await db.exec(update(LoanCounter).where(LoanCounter.name == name).values(value=LoanCounter.value + delta))
+
+
+async def record_checkouts(db: AsyncSession, loans: list[tuple[int, int, date]]):
+    """Count new loans, given as (book_id, member_id, borrow_date), in the caller's transaction"""
+    if not loans:
+        return
+    deltas = {"open_loans": 1, "total_loans": 1}
+    await _upsert(db, BookLoanStats, "book_id", [{"book_id": b, "last_borrowed": d, **deltas} for b, _, d in loans])
+    await _upsert(
+        db, MemberLoanStats, "member_id", [{"member_id": m, "last_borrowed": d, **deltas} for _, m, d in loans]
+    )
+    await _bump_counters(db, total_loans=len(loans), open_loans=len(loans))
+
+
+async def record_returns(db: AsyncSession, loans: list[tuple[int, int]]):
+    """Close loans, given as (book_id, member_id), in the caller's transaction"""
+    if not loans:
+        return
+    deltas = {"open_loans": -1, "total_loans": 0, "last_borrowed": None}
+    await _upsert(db, BookLoanStats, "book_id", [{"book_id": b, **deltas} for b, _ in loans])
+    await _upsert(db, MemberLoanStats, "member_id", [{"member_id": m, **deltas} for _, m in loans])
+    await _bump_counters(db, open_loans=-len(loans))
+
+
+async def forget_member(db: AsyncSession, member_id: int):
+    """Remove the loans of a member that is about to be deleted (with its records) from the counters"""
+    member_loans = select(BorrowingRecords.book_id).where(BorrowingRecords.member_id == member_id)
+    # The books this member borrowed are recounted without the member's records
+    other_loans = select(BorrowingRecords).where(
+        BorrowingRecords.book_id == BookLoanStats.book_id, BorrowingRecords.member_id != member_id
+    )
+    await db.exec(
+        update(BookLoanStats)
+        .where(BookLoanStats.book_id.in_(member_loans))
+        .values(
+            total_loans=other_loans.with_only_columns(func.count()).scalar_subquery(),
+            last_borrowed=other_loans.with_only_columns(func.max(BorrowingRecords.borrow_date)).scalar_subquery(),
+        )
+    )
+    counters = select(MemberLoanStats.total_loans, MemberLoanStats.open_loans).where(
+        MemberLoanStats.member_id == member_id
+    )
+    total_loans, open_loans = (await db.exec(counters)).first() or (0, 0)
+    await db.exec(delete(MemberLoanStats).where(MemberLoanStats.member_id == member_id))
+    await _bump_counters(db, total_loans=-total_loans, open_loans=-open_loans)
+
+
+def rebuild_statements() -> list:
+    """Statements recomputing every counter from borrowingrecords, for the sync (CLI) and async engines"""
+    is_open = func.sum(case((BorrowingRecords.return_date.is_(None), 1), else_=0))
+    per_book = select(
+        BorrowingRecords.book_id, is_open, func.count(), func.max(BorrowingRecords.borrow_date)
+    ).group_by(BorrowingRecords.book_id)
+    per_member = select(
+        BorrowingRecords.member_id, is_open, func.count(), func.max(BorrowingRecords.borrow_date)
+    ).group_by(BorrowingRecords.member_id)
+    columns = ["open_loans", "total_loans", "last_borrowed"]
+    return [
+        delete(BookLoanStats),
+        delete(MemberLoanStats),
+        delete(LoanCounter),
+        BookLoanStats.__table__.insert().from_select(["book_id", *columns], per_book),
+        MemberLoanStats.__table__.insert().from_select(["member_id", *columns], per_member),
+        LoanCounter.__table__.insert().from_select(
+            ["name", "value"], select(literal("total_loans"), func.count()).select_from(BorrowingRecords)
+        ),
+        LoanCounter.__table__.insert().from_select(
+            ["name", "value"],
+            select(literal("open_loans"), func.count()).where(BorrowingRecords.return_date.is_(None)),
+        ),
+    ]
+
+
+async def rebuild_loan_stats(db: AsyncSession):
+    for statement in rebuild_statements():
+        await db.exec(statement)
+    # /stats/* are keyed on the borrowingrecords version, without a bump clients and workers keep the old counters
+    await bump_table_versions(db, "borrowingrecords")
+    await db.commit()
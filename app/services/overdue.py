@@ -0,0 +1,50 @@
+import asyncio
+import logging
+
+from sqlmodel import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.settings import settings
+from app.models.engine import SessionLocal
+from app.models.models import BorrowingRecords
+from app.services.loan_stats import overdue_before
+
+logger = logging.getLogger(__name__)
+
+
+def overdue_loans(cutoff):
+    # Open loans borrowed before the cutoff: a range scan at the start of the open-loans borrow_date index
+    return BorrowingRecords.return_date.is_(None), BorrowingRecords.borrow_date < cutoff
+
+
+async def sweep_overdue_loans(db: AsyncSession) -> int:
+    """Flag the open loans that went past their due date, in batches, and return how many were flagged"""
+    flagged = 0
+    while True:
+        # Each batch is its own short transaction, so the sweep never holds the write lock for long
+        batch = (
+            select(BorrowingRecords.borrow_id)
+            .where(*overdue_loans(overdue_before()), BorrowingRecords.is_overdue.is_(False))
+            .limit(settings.OVERDUE_SWEEP_BATCH_SIZE)
+        )
+        result = await db.exec(
+            update(BorrowingRecords).where(BorrowingRecords.borrow_id.in_(batch)).values(is_overdue=True)
+        )
+        await db.commit()
+        flagged += result.rowcount
+        if result.rowcount < settings.OVERDUE_SWEEP_BATCH_SIZE:
+            return flagged
+
+
+async def run_overdue_sweeper():
+    # Started from the app lifespan and cancelled on shutdown. Every worker runs one, the sweep is
+    # idempotent so concurrent sweeps only repeat each other's (cheap, indexed) work.
+    while True:
+        try:
+            async with SessionLocal() as db:
+                flagged = await sweep_overdue_loans(db)
+            if flagged:
+                logger.info("Flagged overdue loans", extra={"flagged": flagged})
+        except Exception:
+            logger.exception("Overdue sweep failed")  # retried at the next interval
+        await asyncio.sleep(settings.OVERDUE_SWEEP_INTERVAL_SECONDS)
@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any, Protocol
+
+from fastapi import Depends, Request, Response
+
+from app.core.settings import settings
+from app.services.http_cache import conditional_get
+from app.utils.serialization import dump_json
+
+
+class CacheBackend(Protocol):
+    """Storage for rendered responses, anything with these four methods can replace the in-memory one.
+    It calls on_evict(key) for each entry it drops by itself (evicted, expired or too large to store)."""
+
+    on_evict: Callable[[str], None] | None
+
+    def get(self, key: str) -> bytes | None: ...
+
+    def set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+    def delete(self, *keys: str) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class InMemoryCacheBackend:
+    """Per-process LRU store bounded by entry count and total bytes, entries also expire after their TTL."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.on_evict: Callable[[str], None] | None = None
+        self._data: OrderedDict[str, tuple[float, bytes]] = OrderedDict()  # least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._evict(key)
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._remove(key)
+            if len(value) > self.max_bytes:
+                self._notify(key)  # would evict everything else
+                return
+            self._data[key] = (time.monotonic() + ttl, value)
+            self.size += len(value)
+            while len(self._data) > self.max_entries or self.size > self.max_bytes:
+                self._evict(next(iter(self._data)))
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def _remove(self, key: str) -> bool:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+        return entry is not None
+
+    def _evict(self, key: str):
+        if self._remove(key):
+            self._notify(key)
+
+    def _notify(self, key: str):
+        if self.on_evict is not None:
+            self.on_evict(key)
+
+
+class ResponseCache:
+    """Rendered JSON responses, tagged so that writes can drop exactly the entries they make stale."""
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        # Only keys the backend still holds are tracked: the backend reports the ones it drops, so the index
+        # never outgrows the cache (keys embed the ETag, every write leaves the previous ones unreachable).
+        self._keys_by_tag: dict[str, set[str]] = {}
+        self._tags_by_key: dict[str, list[str]] = {}
+        self._lock = threading.Lock()
+        backend.on_evict = self._forget
+
+    def get(self, key: str) -> bytes | None:
+        return self.backend.get(key)
+
+    def set(self, key: str, value: bytes, tags: list[str]):
+        # Tracked before it is stored, so that the backend refusing or evicting it right away untracks it.
+        # The backend calls back into _forget(), it is never called with self._lock held.
+        with self._lock:
+            self._untrack(key)
+            self._tags_by_key[key] = tags
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+        self.backend.set(key, value, self.ttl)
+
+    def invalidate(self, *tags: str):
+        # Called by write routes after their commit. Only this worker's entries are dropped here;
+        # the others can never serve them either, since every key embeds the ETag (table versions).
+        with self._lock:
+            keys = set().union(*(self._keys_by_tag.get(tag, ()) for tag in tags))
+            for key in keys:
+                self._untrack(key)
+        self.backend.delete(*keys)
+
+    def clear(self):
+        with self._lock:
+            self._keys_by_tag.clear()
+            self._tags_by_key.clear()
+        self.backend.clear()
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._untrack(key)
+
+    def _untrack(self, key: str):
+        for tag in self._tags_by_key.pop(key, ()):
+            keys = self._keys_by_tag[tag]
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_tag[tag]
+
+
+response_cache = ResponseCache(
+    InMemoryCacheBackend(
+        max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+        max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+    ),
+    ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+)
+
+
+class CachedRead:
+    """Per-request handle given to cached read endpoints by the cached_read() dependency."""
+
+    def __init__(self, key: str, response: Response):
+        self.key = key
+        self.response = response
+
+    def lookup(self) -> Response | None:
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return None
+        body = response_cache.get(self.key)
+        return None if body is None else self._json_response(body)
+
+    def store(self, response_model: Any, content: Any, tags: list[str]) -> Response:
+        # Validated and rendered once by pydantic-core, later hits send these bytes as they are.
+        body = dump_json(response_model, content)
+        if settings.RESPONSE_CACHE_ENABLED:
+            response_cache.set(self.key, body, tags)
+        return self._json_response(body)
+
+    def _json_response(self, body: bytes) -> Response:
+        # FastAPI does not merge the headers set by dependencies (ETag, Last-Modified, ...)
+        # into a Response returned by the endpoint, so they are copied here.
+        response = Response(content=body, media_type="application/json")
+        response.headers.raw.extend(self.response.headers.raw)
+        return response
+
+
+def cached_read(*tables: str, daily: bool = False):
+    # Dependency for read endpoints served from response_cache. The cache key is the request URL plus
+    # the ETag from conditional_get(), so an entry can only be served while the tables it was built
+    # from are unchanged, in any worker.
+    async def dependency(
+        request: Request, response: Response, etag: str = Depends(conditional_get(*tables, daily=daily))
+    ) -> CachedRead:
+        return CachedRead(key=f"{request.url.path}?{request.url.query}|{etag}", response=response)
+
+    return dependency
@@ -0,0 +1,37 @@
+import re
+
+from sqlalchemy import and_, column, func, literal_column, or_, table
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.models import Book
+
+# FTS5 index over book(title, author, isbn), created by migration f0aeb8b57d3b on SQLite only
+book_fts = table("book_fts", column("rowid"))
+
+# Weights given by bm25() to the title, author and isbn columns (lower rank = better match)
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+
+def search_terms(q: str) -> list[str]:
+    # Words only, so user input can never inject FTS5 query syntax (quotes, NEAR, column filters, ...)
+    return re.findall(r"\w+", q.lower())
+
+
+def uses_fts(db: AsyncSession) -> bool:
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def apply_search(query, terms: list[str], fts: bool):
+    # Every term must match and each one is matched as a prefix, so "tolk hob" finds "The Hobbit" by Tolkien.
+    if fts:
+        match = " ".join(f'"{term}"*' for term in terms)
+        return (
+            query.join(book_fts, book_fts.c.rowid == Book.id)
+            .where(literal_column("book_fts").op("MATCH")(match))
+            .order_by(func.bm25(literal_column("book_fts"), *BM25_WEIGHTS), Book.id)
+        )
+
+    # Fallback for databases without FTS5: unranked substring matching, still a single query.
+    return query.where(
+        and_(*(or_(Book.title.ilike(f"%{t}%"), Book.author.ilike(f"%{t}%"), Book.isbn.ilike(f"%{t}%")) for t in terms))
+    ).order_by(Book.id)
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from pydantic_core import to_json
+
+from app.core.settings import settings
+from app.utils.cache import TTLCache
+from app.utils.metrics import http_requests_shed
+
+logger = logging.getLogger(__name__)
+
+# Monitoring must keep working when the API is overloaded, it is never queued or shed
+EXEMPT_PATHS = {"/metrics"}
+
+
+class AdmissionGate:
+    """At most `limit` requests of a class in progress, at most `queue_size` more waiting for a slot"""
+
+    def __init__(self, name: str, limit: int, queue_size: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.in_progress = 0
+        self._waiters: deque[asyncio.Future] = deque()  # FIFO, only touched from the event loop
+
+    async def acquire(self) -> str | None:
+        """Takes a slot, or returns why the request is shed ("queue_full" or "timeout")"""
+        if self.in_progress < self.limit and not self._waiters:
+            self.in_progress += 1
+            return None
+        if len(self._waiters) >= self.queue_size:
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # release() hands its slot over to the waiter, in_progress stays the same
+            await asyncio.wait_for(waiter, self.timeout)
+            return None
+        except TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                return None  # release() handed the slot over in the loop iteration the deadline fired, keep it
+            return "timeout"
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # the slot arrived as the client went away, pass it on
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_progress -= 1
+
+
+def route_class(method: str, path: str) -> str:
+    # Decided before routing, from the method and path only, so shedding costs nothing
+    if path.startswith("/auth/"):
+        return "auth"  # bcrypt bound
+    if method in ("GET", "HEAD", "OPTIONS"):
+        return "reads"
+    return "writes"  # serialized by SQLite's single writer
+
+
+class AdmissionControlMiddleware:
+    """Bounds the requests in progress per route class, the overflow waits in a bounded queue or gets 503"""
+
+    def __init__(self, app):
+        self.app = app
+        timeout = settings.ADMISSION_QUEUE_TIMEOUT_MS / 1000
+        self.gates = {
+            name: AdmissionGate(name, limit, settings.ADMISSION_QUEUE_SIZE, timeout)
+            for name, limit in (
+                ("auth", settings.ADMISSION_AUTH_CONCURRENCY),
+                ("reads", settings.ADMISSION_READ_CONCURRENCY),
+                ("writes", settings.ADMISSION_WRITE_CONCURRENCY),
+            )
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.ADMISSION_CONTROL_ENABLED or scope["path"] in EXEMPT_PATHS:
+            return await self.app(scope, receive, send)
+
+        gate = self.gates[route_class(scope["method"], scope["path"])]
+        shed_reason = await gate.acquire()
+        if shed_reason is not None:
+            http_requests_shed.inc(gate.name, shed_reason)
+            logger.warning("Request shed (%s): %s %s", shed_reason, scope["method"], scope["path"])
+            return await _service_unavailable(send)
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+
+async def _service_unavailable(send):
+    # Answered before the request reaches the app, in the same shape as an HTTPException
+    body = to_json({"detail": "Server is overloaded, try again later"})
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(settings.ADMISSION_RETRY_AFTER_SECONDS).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimiter:
+    """Token bucket per key: `rate` requests per second on average, bursts of up to `burst` requests"""
+
+    def __init__(self, rate: float, burst: int, maxsize: int):
+        self.rate = rate
+        self.burst = burst
+        # key -> [tokens, updated_at]. A bucket left alone for burst / rate seconds is full again,
+        # so it can expire and be recreated full.
+        self._buckets = TTLCache(maxsize=maxsize, ttl=burst / rate if rate > 0 else 0)
+
+    def acquire(self, key) -> float:
+        """Takes a token, returns 0 when allowed or else the seconds until a token is available"""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(self.burst), now]
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        self._buckets.set(key, bucket)
+        if bucket[0] < 1:
+            return (1 - bucket[0]) / self.rate
+        bucket[0] -= 1
+        return 0.0
@@ -1,41 +1,83 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 import bcrypt
-from fastapi import HTTPException
+from fastapi import HTTPException, status
 from jose import jwt
 from jose.exceptions import ExpiredSignatureError, JWSSignatureError
 
 from app.core.settings import settings
 
+# bcrypt runs on its own small pool (it releases the GIL while hashing) instead of the shared
+# AnyIO threadpool, so a burst of logins can use at most BCRYPT_WORKERS cores and never
+# takes the threads that the rest of the API needs.
+_hashing_executor = ThreadPoolExecutor(max_workers=settings.BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+_pending_hashing_jobs = 0
+
+logger = logging.getLogger(__name__)
+
 
 def hash_password(plain_password: str) -> str:
     # Hash the password using bcrypt
     # plain_password is str, need to encode it to bytes.
     # encode defaults using UTF-8, which is standard for text data.
     # result of hashpw is bytes, decode it back to str for storage in the database.
-    return bcrypt.hashpw(plain_password.encode(), bcrypt.gensalt()).decode()
+    return bcrypt.hashpw(plain_password.encode(), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)).decode()
 
 
 def is_password_valid(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
 
 
+def needs_rehash(hashed_password: str) -> bool:
+    # bcrypt hashes look like "$2b$12$<salt+hash>", the second field is the cost factor.
+    return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+
+
+async def _run_hashing_job(func, *args):
+    # Back-pressure: once BCRYPT_MAX_PENDING jobs are queued or running, new ones are rejected
+    # right away rather than waiting behind seconds of queued work.
+    # The counter is only touched from the event loop, so it needs no lock.
+    global _pending_hashing_jobs
+    if _pending_hashing_jobs >= settings.BCRYPT_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, try again later",
+            headers={"Retry-After": "1"},
+        )
+
+    _pending_hashing_jobs += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hashing_executor, func, *args)
+    finally:
+        _pending_hashing_jobs -= 1
+
+
+async def hash_password_async(plain_password: str) -> str:
+    return await _run_hashing_job(hash_password, plain_password)
+
+
+async def is_password_valid_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hashing_job(is_password_valid, plain_password, hashed_password)
+
+
 def generate_token(data: dict):
     copied_data = data.copy()
     copied_data["exp"] = datetime.utcnow() + timedelta(minutes=settings.JWT_EXP_MINUTES)
     return jwt.encode(copied_data, settings.SECRET_KEY, algorithm="HS256")
 
 
-def validate_token(token: str):
+def decode_token(token: str) -> dict | None:
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        return payload.get("id", None)
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
     except JWSSignatureError as e:
-        print(f"Token validation error: {e}")
+        logger.warning("Token validation error: %s", e)
         return None
     except ExpiredSignatureError as e:
-        print(f"Token expired: {e}")
+        logger.debug("Token expired: %s", e)
         raise HTTPException(status_code=401, detail="Token has expired")
     except Exception as e:
-        print(f"Unexpected error during token validation: {e}")
+        logger.warning("Unexpected error during token validation: %s", e)
         return None
@@ -0,0 +1,164 @@
+import zlib
+from collections.abc import Callable
+
+from app.core.settings import settings
+
+# zstd is in the standard library from Python 3.14 (PEP 784), older interpreters can use the zstandard package.
+# brotli is optional (pip install brotli), without it clients asking for "br" get zstd or gzip.
+try:
+    from compression import zstd
+except ImportError:
+    zstd = None
+    try:
+        import zstandard
+    except ImportError:
+        zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+# An encoder is (compress, flush, finish): compress() may buffer, flush() returns everything compressed so far
+# so that a streamed chunk reaches the client without waiting for the next one, finish() ends the stream.
+Encoder = tuple[Callable[[bytes], bytes], Callable[[], bytes], Callable[[], bytes]]
+
+
+def _gzip_encoder() -> Encoder:
+    compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def _zstd_encoder() -> Encoder:
+    if zstd is not None:
+        compressor = zstd.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL)
+        return (
+            compressor.compress,
+            lambda: compressor.flush(zstd.ZstdCompressor.FLUSH_BLOCK),
+            lambda: compressor.flush(zstd.ZstdCompressor.FLUSH_FRAME),
+        )
+    compressor = zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compressobj()
+    return compressor.compress, lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK), compressor.flush
+
+
+def _brotli_encoder() -> Encoder:
+    compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_LEVEL)
+    return compressor.process, compressor.flush, compressor.finish
+
+
+ENCODERS: dict[str, Callable[[], Encoder]] = {"gzip": _gzip_encoder}
+if zstd is not None or zstandard is not None:
+    ENCODERS["zstd"] = _zstd_encoder
+if brotli is not None:
+    ENCODERS["br"] = _brotli_encoder
+
+# JSON pages, NDJSON / CSV exports, the docs. Images and archives are already compressed.
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """The first of COMPRESSION_ENCODINGS the client accepts (q > 0), None to send the body as is"""
+    accepted = {}
+    for entry in accept_encoding.lower().split(","):
+        name, _, params = entry.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        accepted[name.strip()] = quality
+
+    for encoding in settings.COMPRESSION_ENCODINGS:
+        if encoding in ENCODERS and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """Compresses response bodies chunk by chunk, streamed responses included, with the client's preferred encoding"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED:
+            return await self.app(scope, receive, send)
+
+        accept_encoding = dict(scope["headers"]).get(b"accept-encoding", b"").decode("latin-1")
+        encoding = choose_encoding(accept_encoding) if accept_encoding else None
+        start = None  # http.response.start, held back until the first body chunk shows whether to compress
+        encoder: Encoder | None = None
+
+        async def send_compressed(message):
+            nonlocal start, encoder
+            if message["type"] == "http.response.start":
+                if encoding is None:
+                    return await send(_with_vary(message))  # sent as is to this client, compressed to others
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if start is not None:
+                # First body chunk. A complete body below the threshold is not worth compressing,
+                # a streamed one is compressed whatever its first chunk, its total size is unknown.
+                response_start, start = start, None
+                headers = response_start.get("headers", [])
+                if not _is_compressible(headers) or (not more_body and len(body) < settings.COMPRESSION_MIN_SIZE):
+                    await send(_with_vary(response_start))
+                    return await send(message)
+
+                encoder = ENCODERS[encoding]()
+                headers = [(name, value) for name, value in headers if name.lower() != b"content-length"]
+                headers = [*_add_vary(headers), (b"content-encoding", encoding.encode())]
+                if not more_body:
+                    body = encoder[0](body) + encoder[2]()
+                    headers.append((b"content-length", str(len(body)).encode()))
+                    await send({**response_start, "headers": headers})
+                    return await send({**message, "body": body})
+                await send({**response_start, "headers": headers})
+
+            if encoder is None:
+                return await send(message)
+            compress, flush, finish = encoder
+            body = compress(body) + (flush() if more_body else finish())
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def _with_vary(start: dict) -> dict:
+    # Whether a response is compressed depends on Accept-Encoding, so every response that could be compressed
+    # says so, a cache must not hand an uncompressed copy to a client asking for zstd or the other way round.
+    # A 304 stands for the full response and repeats its Vary.
+    headers = start.get("headers", [])
+    if start["status"] == 304 or _is_compressible(headers):
+        return {**start, "headers": _add_vary(headers)}
+    return start
+
+
+def _add_vary(headers: list[tuple[bytes, bytes]]) -> list[tuple[bytes, bytes]]:
+    # Merged into the endpoint's own Vary (e.g. Authorization), a second Vary header is easily dropped by proxies
+    for i, (name, value) in enumerate(headers):
+        if name.lower() == b"vary":
+            fields = {field.strip().lower() for field in value.split(b",")}
+            if b"*" in fields or b"accept-encoding" in fields:
+                return headers
+            return [*headers[:i], (name, value + b", Accept-Encoding"), *headers[i + 1 :]]
+    return [*headers, (b"vary", b"Accept-Encoding")]
+
+
+def _is_compressible(headers: list[tuple[bytes, bytes]]) -> bool:
+    content_type = b""
+    for name, value in headers:
+        name = name.lower()
+        if name == b"content-encoding":
+            return False  # already encoded by the endpoint
+        if name == b"content-type":
+            content_type = value
+    return content_type.decode("latin-1").lower().startswith(COMPRESSIBLE_TYPES)
@@ -0,0 +1,178 @@
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Metrics live in the worker process, Prometheus scrapes each worker (or sums them) like any other target.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, label_values)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...], buckets: tuple[float, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._values: dict[tuple, list] = {}  # label values -> [count per bucket..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._values.setdefault(label_values, [0] * (len(self.buckets) + 2))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1  # buckets are cumulative, as Prometheus expects
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, series in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, series):
+                    labels = _labels((*self.labels, "le"), (*label_values, f"{bound:g}"))
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                lines.append(f"{self.name}_bucket{_labels((*self.labels, 'le'), (*label_values, '+Inf'))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {series[-2]:g}")
+                lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {series[-1]}")
+        return lines
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+# Routes are labelled with their template (/books/{id}), never the raw path, to keep the number of series bounded.
+http_requests = Counter("http_requests_total", "HTTP requests handled", ("method", "route", "status"))
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Time to handle a request", ("method", "route"), LATENCY_BUCKETS
+)
+http_request_db_statements = Histogram(
+    "http_request_db_statements", "SQL statements executed per request", ("method", "route"), STATEMENT_BUCKETS
+)
+http_request_db_duration = Histogram(
+    "http_request_db_duration_seconds", "Time spent in SQL statements per request", ("method", "route"), LATENCY_BUCKETS
+)
+db_slow_queries = Counter("db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS", ("route",))
+http_requests_shed = Counter(
+    "http_requests_shed_total", "Requests answered 503 by admission control", ("route_class", "reason")
+)
+
+METRICS = (
+    http_requests,
+    http_request_duration,
+    http_request_db_statements,
+    http_request_db_duration,
+    db_slow_queries,
+    http_requests_shed,
+)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+class RequestStats:
+    """SQL activity of the request being handled, filled in by the engine hooks"""
+
+    __slots__ = ("scope", "statements", "db_time")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.statements = 0
+        self.db_time = 0.0
+
+    @property
+    def route(self) -> str:
+        # The router stores the matched route in the scope, paths that match no route share one label
+        return getattr(self.scope.get("route"), "path_format", "unmatched")
+
+
+# Set by MetricsMiddleware. SQLAlchemy runs the async engine's hooks in a greenlet that shares the calling
+# task's context, so they see the stats object of the request that issued the statement.
+current_request_stats: ContextVar[RequestStats | None] = ContextVar("current_request_stats", default=None)
+
+
+def record_query(statement: str, parameters, duration: float):
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_time += duration
+
+    if duration * 1000 >= settings.SLOW_QUERY_MS:
+        route = stats.route if stats is not None else "background"
+        db_slow_queries.inc(route)
+        if settings.SLOW_QUERY_LOG_PARAMETERS:
+            logger.warning(
+                "Slow query (%.1f ms) on %s: %s | parameters: %.500r", duration * 1000, route, statement, parameters
+            )
+        else:
+            logger.warning("Slow query (%.1f ms) on %s: %s", duration * 1000, route, statement)
+
+
+class MetricsMiddleware:
+    """Times every request, counts its SQL statements and reports both as metrics and Server-Timing"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(scope)
+        token = current_request_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500  # if the app fails before sending a response
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.SERVER_TIMING_ENABLED:
+                    # Measured when the headers leave, a streamed body is still running at this point
+                    elapsed = (time.perf_counter() - started) * 1000
+                    server_timing = (
+                        f'app;dur={elapsed:.1f}, db;dur={stats.db_time * 1000:.1f};desc="{stats.statements} queries"'
+                    )
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", server_timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request_stats.reset(token)
+            method, route = scope["method"], stats.route
+            http_requests.inc(method, route, str(status_code))
+            http_request_duration.observe(time.perf_counter() - started, method, route)
+            http_request_db_statements.observe(stats.statements, method, route)
+            http_request_db_duration.observe(stats.db_time, method, route)
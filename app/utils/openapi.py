@@ -0,0 +1,48 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+import fastapi
+import pydantic
+from fastapi import FastAPI
+
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+APP_ROOT = Path(__file__).parent.parent
+FINGERPRINT_KEY = "x-schema-fingerprint"
+# Credentials are not hashed into a file that may be shipped, and where the schema is read from does not change it
+_UNHASHED_SETTINGS = {"SECRET_KEY", "DATABASE_URL", "DATABASE_READ_URLS", "OPENAPI_SCHEMA_PATH"}
+
+
+def build_openapi_schema(app: FastAPI) -> dict:
+    # What FastAPI does on the first /openapi.json request: walks every route and model, tens of ms per worker
+    return FastAPI.openapi(app)
+
+
+def schema_fingerprint() -> str:
+    # Everything the schema is built from: the app's code (routes, models, descriptions), the FastAPI and
+    # pydantic versions and the settings (page sizes, batch limits, ...). Hashing them takes about a millisecond.
+    digest = hashlib.sha256(f"fastapi {fastapi.__version__} pydantic {pydantic.VERSION}".encode())
+    for path in sorted(APP_ROOT.rglob("*.py")):
+        digest.update(str(path.relative_to(APP_ROOT)).encode())
+        digest.update(path.read_bytes())
+    digest.update(settings.model_dump_json(exclude=_UNHASHED_SETTINGS).encode())
+    return digest.hexdigest()
+
+
+def export_openapi_schema(app: FastAPI) -> dict:
+    return {**build_openapi_schema(app), FINGERPRINT_KEY: schema_fingerprint()}
+
+
+def load_openapi_schema(path: Path) -> dict | None:
+    """The schema exported by app.scripts.export_openapi, None if it is missing or was built from other inputs"""
+    if not path.is_file():
+        return None
+    schema = json.loads(path.read_bytes())
+    if schema.pop(FINGERPRINT_KEY, None) != schema_fingerprint():
+        logger.warning("%s was exported from other code or settings, building the schema instead", path)
+        return None
+    return schema
@@ -0,0 +1,71 @@
+import base64
+import binascii
+import json
+from datetime import date
+
+from fastapi import HTTPException, Query, status
+
+from app.core.settings import settings
+
+
+def encode_cursor(last_key: int | tuple) -> str:
+    # The cursor is opaque for clients: a url-safe base64 of the last key seen on the page.
+    # Clients must not build cursors themselves, so the format can change without breaking them.
+    payload = json.dumps({"after": last_key}, separators=(",", ":"), default=date.isoformat).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def _decode_after(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))["after"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise _invalid_cursor()
+
+
+def decode_cursor(cursor: str) -> int:
+    after = _decode_after(cursor)
+    if not isinstance(after, int):
+        raise _invalid_cursor()
+    return after
+
+
+def decode_date_cursor(cursor: str) -> tuple[date, int]:
+    # Pages ordered by (date, id) carry both in the cursor, the row they point to may be gone by the next page
+    after = _decode_after(cursor)
+    if not (isinstance(after, list) and len(after) == 2 and isinstance(after[0], str) and isinstance(after[1], int)):
+        raise _invalid_cursor()
+    try:
+        return date.fromisoformat(after[0]), after[1]
+    except ValueError:
+        raise _invalid_cursor()
+
+
+def page_limit(
+    limit: int = Query(default=settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+) -> int:
+    return limit
+
+
+def paginate(query, key_column, cursor: str | None, limit: int):
+    # Keyset pagination: "WHERE key > last_key ORDER BY key LIMIT n" is an index range scan on the
+    # primary key, so every page costs the same no matter how deep the client has scrolled.
+    # One extra row is fetched to know whether a next page exists without a COUNT(*).
+    if cursor is not None:
+        query = query.where(key_column > decode_cursor(cursor))
+    return query.order_by(key_column).limit(limit + 1)
+
+
+def build_page(rows, limit: int, key: str | tuple[str, ...]) -> dict:
+    # key names the attribute(s) of the last row that the next page continues after
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        last_key = getattr(last, key) if isinstance(key, str) else tuple(getattr(last, name) for name in key)
+        next_cursor = encode_cursor(last_key)
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,36 @@
+from typing import Any
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+
+class PydanticJSONResponse(JSONResponse):
+    """JSONResponse rendered by pydantic-core instead of the stdlib json module, with the same output shape."""
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+_type_adapters: dict[Any, TypeAdapter] = {}
+
+
+def _type_adapter(response_model: Any) -> TypeAdapter:
+    # Building a TypeAdapter compiles its validator and serializer, so one is kept per response model.
+    if response_model not in _type_adapters:
+        _type_adapters[response_model] = TypeAdapter(response_model)
+    return _type_adapters[response_model]
+
+
+def dump_json(response_model: Any, content: Any) -> bytes:
+    # Validates the rows (or ORM objects) once, reading their attributes, and renders them to JSON bytes
+    # in pydantic-core. FastAPI would otherwise validate, dump to Python objects and then encode again.
+    adapter = _type_adapter(response_model)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+
+def json_response(response_model: Any, content: Any) -> Response:
+    # A Response returned by the endpoint skips FastAPI's response_model handling, response_model is still
+    # declared on the route for the OpenAPI schema.
+    return Response(content=dump_json(response_model, content), media_type="application/json")
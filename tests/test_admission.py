@@ -0,0 +1,66 @@
+import asyncio
+import time
+import unittest
+
+from app.utils.admission import AdmissionGate
+
+
+class AdmissionGateTest(unittest.IsolatedAsyncioTestCase):
+    async def test_queue_full(self):
+        gate = AdmissionGate("test", limit=1, queue_size=0, timeout=1)
+        self.assertIsNone(await gate.acquire())
+        self.assertEqual(await gate.acquire(), "queue_full")
+        gate.release()
+        self.assertEqual(gate.in_progress, 0)
+
+    async def test_release_hands_the_slot_to_the_first_waiter(self):
+        gate = AdmissionGate("test", limit=1, queue_size=2, timeout=1)
+        self.assertIsNone(await gate.acquire())
+        first = asyncio.create_task(gate.acquire())
+        second = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)
+
+        gate.release()
+        self.assertIsNone(await first)
+        self.assertFalse(second.done())
+        self.assertEqual(gate.in_progress, 1)
+
+        gate.release()
+        self.assertIsNone(await second)
+        gate.release()
+        self.assertEqual(gate.in_progress, 0)
+
+    async def test_timeout(self):
+        gate = AdmissionGate("test", limit=1, queue_size=1, timeout=0.01)
+        self.assertIsNone(await gate.acquire())
+        self.assertEqual(await gate.acquire(), "timeout")
+        gate.release()
+        self.assertEqual(gate.in_progress, 0)
+
+    async def test_slot_handed_over_as_the_deadline_fires(self):
+        gate = AdmissionGate("test", limit=1, queue_size=1, timeout=0.01)
+        self.assertIsNone(await gate.acquire())
+        waiting = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)  # queued
+
+        time.sleep(0.02)  # blocks the loop past the deadline
+        # The deadline fires in the next loop iteration, before the waiter wakes up with the slot release() hands it
+        await asyncio.sleep(0)
+        gate.release()
+
+        self.assertIsNone(await waiting)
+        self.assertEqual(gate.in_progress, 1)
+        gate.release()
+        self.assertEqual(gate.in_progress, 0)
+
+    async def test_slot_handed_over_as_the_client_goes_away(self):
+        gate = AdmissionGate("test", limit=1, queue_size=1, timeout=1)
+        self.assertIsNone(await gate.acquire())
+        waiting = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)
+
+        gate.release()
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(gate.in_progress, 0)